@@ -3,7 +3,8 @@ import numpy as np
 import ast
 from nltk.stem.porter import PorterStemmer
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix
 from flask import Flask, request, jsonify, session, send_from_directory
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -12,14 +13,22 @@ import os
 import requests
 import time
 import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from urllib3 import PoolManager
-from difflib import get_close_matches
+from difflib import SequenceMatcher
+from bisect import bisect_left
+from functools import lru_cache
+import hashlib
 import pickle
+import sqlite3
 
 
 # --- Configure Requests Session with Retry Strategy ---
@@ -33,6 +42,18 @@ adapter = HTTPAdapter(max_retries=retry_strategy)
 requests_session.mount("https://", adapter)
 requests_session.mount("http://", adapter)
 
+# Enrichment gets its own session: HTTP errors are not retried by urllib3 but handled by
+# fetch_tmdb_movie(), so a 429 can pause every worker through the shared rate limiter
+ENRICHMENT_WORKERS = int(os.environ.get('ENRICHMENT_WORKERS', 8))
+enrichment_session = requests.Session()
+enrichment_adapter = HTTPAdapter(
+    max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[], respect_retry_after_header=False),
+    pool_connections=1,
+    pool_maxsize=ENRICHMENT_WORKERS
+)
+enrichment_session.mount("https://", enrichment_adapter)
+enrichment_session.mount("http://", enrichment_adapter)
+
 # --- Connection Pooling Configuration ---
 http = PoolManager(
     num_pools=5,
@@ -65,7 +86,7 @@ app.config['SESSION_TYPE'] = 'filesystem'
 TMDB_API_KEY = os.environ.get('TMDB_API_KEY', 'YOUR_TMDB_API_KEY')
 TMDB_API_KEY_PLACEHOLDER = 'YOUR_TMDB_API_KEY'
 
-TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', 'https://api.themoviedb.org/3').rstrip('/')
 TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
 PLACEHOLDER_IMAGE_URL = 'https://placehold.co/200x300/333/999?text=No+Poster'
 
@@ -74,28 +95,165 @@ data_dir = 'data'
 movies_csv_path = os.path.join(data_dir, 'tmdb_5000_movies.csv')
 credits_csv_path = os.path.join(data_dir, 'tmdb_5000_credits.csv')
 enriched_data_path = os.path.join(data_dir, 'tmdb_5000_movies_enriched.csv')
-processed_data_cache_path = os.path.join(data_dir, 'processed_data_cache.pkl')
-similarity_cache_path = os.path.join(data_dir, 'similarity_cache.pkl')
-
-# Cache version to force rebuild when mood logic changes
-CACHE_VERSION = '2.0'  # Increment this to force cache rebuild
-cache_version_file = os.path.join(data_dir, 'cache_version.txt')
+# Per-movie TMDB fetch results (status, timestamp, raw payload) so enrichment can resume and run incrementally
+enrichment_checkpoint_path = os.path.join(data_dir, 'enrichment_checkpoints.sqlite')
+# Raw TMDB /movie_details responses shared by all Gunicorn workers
+details_cache_path = os.path.join(data_dir, 'tmdb_details_cache.sqlite')
+# Build artifacts: movies.parquet (processed table), numeric model arrays (.npy, memory-mapped
+# by every worker) and manifest.json recording the input hashes and parameters they were built from
+model_artifacts_dir = os.path.join(data_dir, 'model')
+model_manifest_path = os.path.join(model_artifacts_dir, 'manifest.json')
+movies_table_file = 'movies.parquet'
+# token -> Porter stem memo, reused across builds (lives next to the artifacts but is not versioned with them)
+stem_table_path = os.path.join(model_artifacts_dir, 'stem_table.json')
+# sha256(overview text) -> VADER compound score, so unchanged overviews are never rescored
+sentiment_cache_path = os.path.join(model_artifacts_dir, 'sentiment_cache.json')
+# Pre-artifact pickle cache; only read when neither artifacts nor input CSVs are present
+legacy_processed_data_path = os.path.join(data_dir, 'processed_data_cache.pkl')
+legacy_cache_version_file = os.path.join(data_dir, 'cache_version.txt')
+LEGACY_CACHE_VERSION = '2.0'
+
+# Artifacts are rebuilt automatically when an input CSV or build parameter changes.
+# Bump this only when the preprocessing code itself changes what gets produced.
+ARTIFACT_SCHEMA_VERSION = 9
 
 # Processing mode - set to True to process all movies (use in Docker locally)
 PROCESS_ALL_MOVIES = os.environ.get('PROCESS_ALL_MOVIES', 'false').lower() == 'true'
-MAX_MOVIES = None if PROCESS_ALL_MOVIES else 2000  # Limit for Render processing
+# Optional cap on catalog size. The neighbor index grows O(N*K), so the full catalog is served by default.
+MAX_MOVIES = None if PROCESS_ALL_MOVIES else (int(os.environ.get('MAX_MOVIES', 0)) or None)
+
+# Per-movie preprocessing (parsing, tokenizing, sentiment, stemming) runs over chunks of this many
+# movies on a process pool. preprocess_data.py --workers overrides the worker count.
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', 1))
+PREPROCESS_CHUNK_SIZE = 256
+USER_SENTIMENT_CACHE_SIZE = 4096  # Request-time VADER scores kept for repeated user phrases
+
+# Most titles plus movie_ids accepted by one /recommend_batch request
+RECOMMEND_BATCH_MAX_SIZE = int(os.environ.get('RECOMMEND_BATCH_MAX_SIZE', 100))
+
+# List endpoints page with limit/cursor; format=ndjson streams this many movies per chunk
+NDJSON_BATCH_SIZE = 100
+
+# Vocabulary size of the tag vectorizer
+VECTORIZER_MAX_FEATURES = 5000 if PROCESS_ALL_MOVIES else 3000
+
+# Neighbor index - keep only the top-K most similar movies per title. The index engine filters
+# only these K, so a movie whose neighbors mostly fail the quality/genre filters can get fewer
+# than 20 recommendations; raise NEIGHBOR_K (or use the sparse engine) to fill more lists
+NEIGHBOR_K = int(os.environ.get('NEIGHBOR_K', 200))
+NEIGHBOR_CHUNK_SIZE = 512  # Rows of the similarity matrix materialized at once during the build
+
+# Recommendation engine: 'index' reads the precomputed top-K neighbors,
+# 'sparse' scores one row on demand against the L2-normalized CSR feature matrix (no O(N^2) build step)
+RECOMMENDATION_ENGINE = os.environ.get('RECOMMENDATION_ENGINE', 'index').strip().lower()
+if RECOMMENDATION_ENGINE not in ('index', 'sparse'):
+    raise ValueError(f"Unknown RECOMMENDATION_ENGINE '{RECOMMENDATION_ENGINE}'. Use 'index' or 'sparse'")
 
 # Profanity filter - list of inappropriate words to block
 PROFANITY_LIST = {
     'fuck', 'shit', 'bitch', 'ass', 'damn', 'hell', 'crap', 'dick', 'pussy', 
     'bastard', 'asshole', 'whore', 'slut', 'fag', 'nigger', 'retard', 'cunt',
-    'cock', 'porn', 'sex', 'xxx', 'nsfw', 'nude', 'naked', 'rape', 'kill', 'murder'
+    'cock', 'porn', 'sex', 'xxx', 'nsfw', 'nude', 'naked', 'rape', 'kill', 'murder',
+    'jackass', 'dumbass'
+}
+# Short roots that also occur inside everyday words ('class', 'hello', 'skills', 'cocktail', 'scrap',
+# 'grape') only match as whole words plus common inflections ('kills', 'sexy'). Every other root
+# matches anywhere in a word, so 'motherfucker', 'bullshit', 'shitty' and 'fuckin' are caught.
+PROFANITY_WHOLE_WORDS = {'ass', 'hell', 'sex', 'kill', 'cock', 'dick', 'crap', 'rape'}
+PROFANITY_PATTERN = re.compile(
+    r"\b(?:" + "|".join(sorted(map(re.escape, PROFANITY_WHOLE_WORDS), key=len, reverse=True)) + r")(?:s|es|d|ed|er|ers|ing|y)?\b"
+    + r"|" + "|".join(sorted(map(re.escape, PROFANITY_LIST - PROFANITY_WHOLE_WORDS), key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Mood/category -> genre rules in conjunctive form: a movie matches when it has
+# at least one genre from every clause. Compiled into bitmask tests over the genre index.
+MOOD_GENRE_RULES = {
+    'Horror': [['horror']],
+    'Intense/Mystery': [['mystery', 'crime', 'thriller']],
+    'Romcom': [['comedy'], ['romance']],
+    'Happy': [['comedy', 'family', 'animation']],
+    'Action/Adventure': [['action', 'adventure']],
+    'Drama': [['drama']],
+    'Thought-Provoking': [['documentary', 'history']],
+    'Romantic/Dramatic': [['romance']],
+    'Relaxing': [['comedy', 'family', 'animation']],
+    'Escapist': [['fantasy', 'science fiction', 'adventure']],
 }
+# Browse categories; anything not listed here falls back to the precomputed mood_category
+CATEGORY_GENRE_RULES = {
+    'Horror': MOOD_GENRE_RULES['Horror'],
+    'Intense/Mystery': MOOD_GENRE_RULES['Intense/Mystery'],
+    'Romcom': MOOD_GENRE_RULES['Romcom'],
+    'Happy': MOOD_GENRE_RULES['Happy'],
+    'Action/Adventure': MOOD_GENRE_RULES['Action/Adventure'],
+    'Drama': MOOD_GENRE_RULES['Drama'],
+    'Western': [['western']],
+    'Fantasy': [['fantasy']],
+    'Science Fiction': [['science fiction', 'sci-fi']],
+    'Superhero': [['science fiction', 'fantasy'], ['action', 'adventure']],
+}
+CATEGORY_ALIASES = {
+    'Intense': 'Intense/Mystery', 'Intense Mystery': 'Intense/Mystery', 'Mystery/Intense': 'Intense/Mystery',
+}
+CATEGORY_RULE_ALIASES = {'Sci-Fi': 'Science Fiction', 'Scifiction': 'Science Fiction'}
+
+# Free-text mood vocabulary, in priority order: the first rule with a keyword found anywhere
+# in the text (or an exact match on the whole trimmed text) decides the mood.
+MOOD_KEYWORD_RULES = [
+    # Emotional/Dramatic routes
+    ('Drama', ['had a tough day', 'tough day', 'stress', 'stressed', 'exhausted', 'tired', 'drained', 'burnt out', 'burned out', 'overwhelmed', 'sad', 'heartbroken', 'heart broken', 'breakup', 'broke up', 'lonely', 'alone', 'depressed'], []),
+    # Strong signals first
+    ('Horror', ['horror', 'scary', 'spooky', 'creepy', 'gore', 'gory', 'slasher', 'ghost', 'zombie', 'paranormal', 'possession'], []),
+    # Mood buttons: Mysterious -> Intense/Mystery, Thrilling -> Action/Adventure
+    ('Intense/Mystery', ['mysterious'], []),
+    ('Action/Adventure', ['thrilling'], ['thriller']),
+    ('Intense/Mystery', ['mystery', 'crime', 'detective', 'puzzle', 'thriller', 'suspense', 'noir', 'whodunit',
+                         'psychological', 'twist', 'investigation', 'serial killer', 'heist', 'conspiracy'], []),
+    # Romantic button - maps to broader romance
+    ('Romantic/Dramatic', [], ['romantic']),
+    ('Romcom', ['romcom', 'rom-com', 'romantic comedy', 'meet-cute', 'date night', 'banter', 'cute rom', 'feel-good romance', 'light romance'], []),
+    ('Romantic/Dramatic', ['romance', 'love', 'relationship', 'heartfelt', 'romantic drama'], []),
+    ('Action/Adventure', ['action', 'adventure', 'fight', 'battle', 'chase', 'spy', 'espionage', 'war', 'martial arts', 'car chase', 'explosive'], []),
+    ('Happy', ['happy', 'joyful', 'fun', 'uplifting', 'comedy', 'lighthearted', 'feel-good', 'wholesome', 'family-friendly', 'light'], []),
+    # Inspiring button, then uplifting/motivational content (sports, biographies, dramas with positive message)
+    ('Thought-Provoking', [], ['inspiring']),
+    ('Thought-Provoking', ['inspirational', 'motivational', 'motivating', 'empowering', 'triumph', 'overcome', 'achievement', 'success story', 'hero', 'heroic', 'courage', 'brave', 'hopeful', 'hope'], []),
+    ('Thought-Provoking', ['documentary', 'learn', 'explore', 'history', 'biography', 'biopic', 'informative', 'educational', 'philosophical', 'mind-bending', 'political', 'social issues', 'true story'], []),
+    ('Relaxing', ['chill', 'relax', 'calm', 'peaceful', 'cozy', 'comfort', 'soothing', 'slow', 'slice of life'], []),
+    ('Escapist', ['fantasy', 'sci-fi', 'science fiction', 'fiction', 'space', 'aliens', 'superhero', 'magical', 'mythical', 'space opera', 'time travel'], []),
+    ('Drama', ['sad', 'melodrama', 'tragic', 'weepie', 'emotional', 'poignant', 'heartbreaking'], []),
+]
+
+# Title n-gram index - every substring up to this length gets a postings list
+TITLE_NGRAM_SIZE = 3
+# Fuzzy title resolution: shortlist by shared n-grams, then re-rank this many with SequenceMatcher
+FUZZY_CANDIDATES = 25
+FUZZY_CUTOFF = 0.6
+FUZZY_POSTINGS_BUDGET = 5000  # Max postings entries counted per lookup; the most common n-grams are skipped first
 
 # Enable enrichment when processing all movies with Docker
 ENRICHMENT_REQUIRED = PROCESS_ALL_MOVIES
-ENRICHMENT_BATCH_SIZE = 50
-ENRICHMENT_DELAY_SECONDS = 1.1
+ENRICHMENT_BATCH_SIZE = 50  # Progress is reported every this many movies
+# /movie_details cache: fresh for TTL, then served stale while a background refresh runs.
+# Entries past TTL + STALE are refetched inline; any cached payload is served if TMDB errors out.
+DETAILS_CACHE_TTL_SECONDS = int(os.environ.get('DETAILS_CACHE_TTL_SECONDS', 6 * 3600))
+DETAILS_CACHE_STALE_SECONDS = int(os.environ.get('DETAILS_CACHE_STALE_SECONDS', 7 * 86400))
+DETAILS_CACHE_MAX_ENTRIES = int(os.environ.get('DETAILS_CACHE_MAX_ENTRIES', 5000))  # Least recently read are evicted
+DETAILS_CACHE_TOUCH_INTERVAL = 60  # Seconds between LRU timestamp refreshes of one entry, so most hits stay read-only
+
+# Checkpointed TMDB responses older than this are fetched again
+ENRICHMENT_MAX_AGE_DAYS = float(os.environ.get('ENRICHMENT_MAX_AGE_DAYS', 30))
+# Requests per second shared by all enrichment workers (TMDB allows roughly 50/s per IP)
+TMDB_RATE_LIMIT_PER_SECOND = float(os.environ.get('TMDB_RATE_LIMIT_PER_SECOND', 40))
+# 429 responses tolerated per movie before it is given up as failed (retried on the next run)
+TMDB_RATE_LIMIT_RETRIES = 5
+# Columns added by enrichment, with the values used when TMDB has no data for a movie
+TMDB_DEFAULT_DETAILS = {
+    'tmdb_poster_path': None, 'tmdb_year': 'Unknown', 'tmdb_genres': [],
+    'tmdb_vote_average': None, 'tmdb_vote_count': None, 'tmdb_collection_id': None,
+    'tmdb_original_language': 'N/A'
+}
 
 # Download NLTK data before initializing analyzer
 try:
@@ -105,175 +263,589 @@ except LookupError:
     nltk.download('vader_lexicon')
 
 df = None
-similarity = None
+neighbor_index = None
+model_arrays = None
+feature_matrix = None
+indexes = None  # Lookup structures derived from df at load time (see build_lookup_indexes)
+result_tables = None  # Precomputed ranked row arrays per mood/category/genre, stored with the model artifacts
+movie_cards = None  # Public response card per row, built once per loaded model (see build_movie_cards)
 
 # Profanity filter function
 def contains_profanity(text):
     """Check if text contains any profane words"""
     if not text:
         return False
-    text_lower = text.lower()
-    words = text_lower.split()
-    # Check for exact word matches and substrings
-    for word in PROFANITY_LIST:
-        if word in text_lower:
-            return True
-    return False
+    return PROFANITY_PATTERN.search(text) is not None
 analyzer = SentimentIntensityAnalyzer()
 
-# --- Helper Functions ---
-def safe_literal_eval(s):
-    if not isinstance(s, str) or not s.strip():
+# --- Mood Classification ---
+def compile_keyword_matcher(rules):
+    """Compile (label, keywords, exact_phrases) rules into an Aho-Corasick automaton.
+
+    Every keyword is inserted once, tagged with the lowest (highest priority) rule index
+    that lists it, so a single pass over the text finds the winning rule.
+    """
+    goto, fail, out = [{}], [0], [len(rules)]
+    exact = {}
+    for rule_idx, (_, keywords, phrases) in enumerate(rules):
+        for phrase in phrases:
+            exact.setdefault(phrase, rule_idx)
+        for kw in keywords:
+            state = 0
+            for ch in kw:
+                if ch not in goto[state]:
+                    goto.append({})
+                    fail.append(0)
+                    out.append(len(rules))
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            out[state] = min(out[state], rule_idx)
+    # Breadth-first failure links; each state's output also covers keywords ending at its suffixes
+    queue = list(goto[0].values())
+    for state in queue:
+        for ch, nxt in goto[state].items():
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            out[nxt] = min(out[nxt], out[fail[nxt]])
+            queue.append(nxt)
+    return {'goto': goto, 'fail': fail, 'out': out, 'exact': exact, 'labels': [r[0] for r in rules]}
+
+def match_keyword_rule(matcher, text):
+    """Index of the highest-priority rule matching text (already lowercased), or None."""
+    goto, fail, out = matcher['goto'], matcher['fail'], matcher['out']
+    no_match = len(matcher['labels'])
+    best = matcher['exact'].get(text.strip(), no_match)
+    state = 0
+    for ch in text:
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        if out[state] < best:
+            best = out[state]
+            if best == 0:
+                break
+    return best if best < no_match else None
+
+MOOD_MATCHER = compile_keyword_matcher(MOOD_KEYWORD_RULES)
+
+def mood_from_sentiment(sentiment_score):
+    # Sentiment-based fallback (no Neutral)
+    if sentiment_score >= 0.7:
+        return 'Happy'
+    elif sentiment_score >= 0.3:
+        return 'Relaxing'
+    elif sentiment_score <= -0.5:
+        return 'Drama'
+    elif sentiment_score <= -0.2:
+        return 'Intense/Mystery'
+    return 'Happy'
+
+@lru_cache(maxsize=USER_SENTIMENT_CACHE_SIZE)
+def user_text_sentiment(text):
+    return analyzer.polarity_scores(text)['compound']
+
+def classify_user_mood(text, sentiment_score=None):
+    """Map free text to a mood via MOOD_KEYWORD_RULES, falling back to VADER sentiment.
+
+    The sentiment score is only computed (when not supplied) if no keyword rule matches.
+    """
+    rule_idx = match_keyword_rule(MOOD_MATCHER, text.lower())
+    if rule_idx is not None:
+        return MOOD_MATCHER['labels'][rule_idx]
+    if sentiment_score is None:
+        sentiment_score = user_text_sentiment(text)
+    return mood_from_sentiment(sentiment_score)
+
+def classify_user_moods(texts, sentiment_scores=None):
+    """Batch form of classify_user_mood, e.g. for replaying query logs."""
+    if sentiment_scores is None:
+        sentiment_scores = [None] * len(texts)
+    return [classify_user_mood(text, score) for text, score in zip(texts, sentiment_scores)]
+
+# --- Ingest ---
+def parse_json_cell(value):
+    """Parse one TMDB list cell (JSON) into Python objects.
+
+    Cells written back by pandas hold Python reprs (e.g. tmdb_genres in the enriched CSV),
+    so ast.literal_eval is the fallback. A bare string is treated as a one-item list.
+    """
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str):
+        return []
+    text = value.strip()
+    if not text:
         return []
+    if text[0] not in '[{':
+        return [text]
     try:
-        s_stripped = s.strip()
-        # Skip if string is too large to prevent timeout
-        if len(s_stripped) > 10000:
+        parsed = json.loads(text)
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(text)
+        except (ValueError, SyntaxError, TypeError, MemoryError):
             return []
-        if s_stripped.startswith(('{', '[')) and s_stripped.endswith(('}', ']')):
-            return ast.literal_eval(s_stripped)
-        return s
-    except (ValueError, SyntaxError, TypeError, MemoryError):
-        return []
+    return parsed if isinstance(parsed, list) else [parsed]
+
+def extract_names(items, limit=None, job=None):
+    """'name' of each entry (optionally only crew with the given job), up to `limit` names."""
+    names = []
+    for item in items:
+        if limit is not None and len(names) >= limit:
+            break
+        if isinstance(item, dict):
+            if 'name' in item and (job is None or item.get('job') == job):
+                names.append(str(item['name']))
+        elif isinstance(item, str):
+            names.append(item)
+    return names
 
-def fetch_genres(data):
-    result_list = []
-    actual_data = []
+def ingest_tmdb_columns(frame):
+    """Parse the JSON columns of the merged TMDB CSVs once, keeping only the fields the model uses.
+
+    Returns flat per-movie lists: genre and keyword names, the top-3 cast, directors and
+    the TMDB genres from enrichment.
+    """
+    return {
+        'genres': [extract_names(parse_json_cell(v)) for v in frame['genres']],
+        'keywords': [extract_names(parse_json_cell(v)) for v in frame['keywords']],
+        'cast': [extract_names(parse_json_cell(v), limit=3) for v in frame['cast']],
+        'crew': [extract_names(parse_json_cell(v), job='Director') for v in frame['crew']],
+        'tmdb_genres': [extract_names(parse_json_cell(v)) for v in frame['tmdb_genres']],
+    }
 
-    if isinstance(data, str):
+def get_mood_category(score, tmdb_genres):
+    genres_list = [g.lower() for g in tmdb_genres if isinstance(g, str)] if isinstance(tmdb_genres, list) else []
+    # Highly specific mappings first
+    if 'horror' in genres_list:
+        return 'Horror'
+    if 'mystery' in genres_list or 'crime' in genres_list or 'thriller' in genres_list:
+        return 'Intense/Mystery'
+    # Romcom requires BOTH comedy and romance
+    if 'comedy' in genres_list and 'romance' in genres_list:
+        return 'Romcom'
+    # Romance takes priority over drama
+    if 'romance' in genres_list:
+        return 'Romantic/Dramatic'
+    # Comedy/family/animation for happy mood
+    if 'comedy' in genres_list or 'family' in genres_list or 'animation' in genres_list:
+        return 'Happy'
+    # Sad category based on low sentiment and specific genres
+    if score < -0.3 and ('drama' in genres_list or 'war' in genres_list):
+        return 'Sad'
+    # Drama only if no romance
+    if 'drama' in genres_list:
+        return 'Drama'
+    if 'documentary' in genres_list or 'history' in genres_list:
+        return 'Thought-Provoking'
+    if 'action' in genres_list or 'adventure' in genres_list:
+        return 'Action/Adventure'
+    if 'music' in genres_list or 'fantasy' in genres_list or 'science fiction' in genres_list:
+        return 'Escapist'
+    # Fallback to sentiment (avoid Neutral category)
+    if score >= 0.5:
+        return 'Happy'
+    elif score <= -0.5:
+        return 'Sad'
+    return 'Happy'
+
+def tokenize_list(lst):
+    """Model tokens for a list of names: spaces removed, lowercased (display names stay intact)."""
+    return [str(item).replace(" ", "").lower() for item in (lst or []) if item is not None]
+
+def preprocess_movie_chunk(chunk):
+    """Per-movie feature stage for one chunk of rows; runs in a worker process.
+
+    `chunk` maps column name -> list of raw cells, including the precomputed sentiment_score.
+    Returns the derived columns (parsed names, display lists, mood category and unstemmed
+    tags) in row order; stemming runs afterwards in stem_tags().
+    """
+    parsed = ingest_tmdb_columns(chunk)
+    out = {col: [] for col in ('genres', 'keywords', 'tmdb_genres', 'cast_display', 'directors_display',
+                               'mood_category', 'tags')}
+    for overview_text, sentiment_score, genres, keywords, cast, crew, tmdb_genres in zip(
+            chunk['overview_text'], chunk['sentiment_score'], parsed['genres'], parsed['keywords'],
+            parsed['cast'], parsed['crew'], parsed['tmdb_genres']):
+        # Display copies for cast and directors before tokenization
+        cast_display = [i for i in cast if isinstance(i, str)]
+        directors_display = [i for i in crew if isinstance(i, str)]
+        overview_tokens = overview_text.lower().split()
+        tags = " ".join(overview_tokens + tokenize_list(genres) + tokenize_list(keywords)
+                        + tokenize_list(cast_display) + tokenize_list(directors_display)).lower()
+        out['genres'].append(genres)
+        out['keywords'].append(keywords)
+        out['tmdb_genres'].append(tmdb_genres)
+        out['cast_display'].append(cast_display)
+        out['directors_display'].append(directors_display)
+        out['mood_category'].append(get_mood_category(sentiment_score, tmdb_genres))
+        out['tags'].append(tags)
+    return out
+
+def run_chunks(fn, chunks, workers):
+    """fn over each chunk, on a process pool when workers > 1; results keep chunk order."""
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fn, chunks))
+    return [fn(chunk) for chunk in chunks]
+
+def score_texts(texts):
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+def score_overview_sentiment(texts, workers=1, cache_path=sentiment_cache_path):
+    """VADER compound score per text.
+
+    Identical texts are scored once, new texts are scored in parallel chunks, and all scores
+    persist keyed by sha256 of the text, so unchanged overviews are never rescored.
+    """
+    lexicon = json.dumps(sorted(analyzer.lexicon.items()))
+    analyzer_id = f"nltk.vader/{nltk.__version__}/{hashlib.sha256(lexicon.encode('utf-8')).hexdigest()[:16]}"
+    scores = {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('analyzer') == analyzer_id:
+            scores = saved['scores']
+    except (OSError, ValueError, KeyError):
+        pass
+    keys = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in scores:
+            missing.setdefault(key, text)
+    print(f"Scoring sentiment for {len(missing)} new overviews ({len(texts) - len(missing)} cached or duplicate)...")
+    if missing:
+        missing_keys, missing_texts = list(missing), list(missing.values())
+        chunks = [missing_texts[i:i + PREPROCESS_CHUNK_SIZE] for i in range(0, len(missing_texts), PREPROCESS_CHUNK_SIZE)]
+        new_scores = [score for chunk in run_chunks(score_texts, chunks, workers) for score in chunk]
+        scores.update(zip(missing_keys, new_scores))
         try:
-            parsed_data = ast.literal_eval(data)
-            if not isinstance(parsed_data, list): actual_data = [parsed_data]
-            else: actual_data = parsed_data
-        except (ValueError, SyntaxError, TypeError):
-            if data: actual_data = [data]
-    elif isinstance(data, list): actual_data = data
-
-    for item in actual_data:
-        if isinstance(item, dict) and 'name' in item: result_list.append(str(item['name']))
-        elif isinstance(item, str): result_list.append(item)
-    return result_list
-
-def fetch_keywords(data):
-    result_list = []
-    actual_data = []
-    if isinstance(data, str):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'analyzer': analyzer_id, 'scores': scores}, f)
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save sentiment cache: {e}")
+    return [scores[key] for key in keys]
+
+def stem_tags(tag_texts, table_path=stem_table_path):
+    """Porter-stem every token of every text, stemming each distinct token only once.
+
+    Stems are memoized in a JSON table that later builds reuse, so only tokens never
+    seen before cost a PorterStemmer call.
+    """
+    ps = PorterStemmer()
+    stemmer_id = f"nltk.PorterStemmer/{nltk.__version__}/{ps.mode}"
+    stems = {}
+    try:
+        with open(table_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('stemmer') == stemmer_id:
+            stems = saved['stems']
+    except (OSError, ValueError, KeyError):
+        pass
+    token_lists = [text.split() for text in tag_texts]
+    missing = {token for tokens in token_lists for token in tokens} - stems.keys()
+    print(f"Stemming {len(missing)} new tokens ({len(stems)} memoized)...")
+    if missing:
+        stems.update((token, ps.stem(token)) for token in missing)
         try:
-            parsed_data = ast.literal_eval(data)
-            if not isinstance(parsed_data, list): actual_data = [parsed_data]
-            else: actual_data = parsed_data
-        except (ValueError, SyntaxError, TypeError):
-            if data: actual_data = [data]
-    elif isinstance(data, list): actual_data = data
-    for item in actual_data:
-        if isinstance(item, dict) and 'name' in item: result_list.append(str(item['name']))
-        elif isinstance(item, str): result_list.append(item)
-    return result_list
-
-def fetch_cast(data):
-    L = [] ; counter = 0 ; actual_data = []
-    if isinstance(data, str):
-        try: parsed_data = ast.literal_eval(data)
-        except (ValueError, SyntaxError, TypeError):
-            if data: parsed_data = [data]
-        if isinstance(parsed_data, list): actual_data = parsed_data
-        elif isinstance(parsed_data, str): actual_data = [parsed_data]
-    elif isinstance(data, list): actual_data = data
-    for item in actual_data:
-        if isinstance(item, dict) and 'name' in item:
-            if counter < 3: L.append(item['name']) ; counter += 1
-            else: break
-        elif isinstance(item, str):
-            if counter < 3: L.append(item) ; counter += 1
-            else: break
-    return L
-
-def fetch_crew(data):
-    L = [] ; actual_data = []
-    if isinstance(data, str):
-        try: parsed_data = ast.literal_eval(data)
-        except (ValueError, SyntaxError, TypeError):
-            if data: parsed_data = [data]
-        if isinstance(parsed_data, list): actual_data = parsed_data
-        elif isinstance(parsed_data, str): actual_data = [parsed_data]
-    elif isinstance(data, list): actual_data = data
-    for item in actual_data:
-        if isinstance(item, dict) and 'job' in item and item['job'] == 'Director' and 'name' in item: L.append(item['name'])
-        elif isinstance(item, str): L.append(item)
-    return L
-
-def fetch_and_parse_tmdb_details(movie_id):
-    if isinstance(movie_id, (pd.Series, pd.DataFrame)):
-        movie_id = movie_id.iloc[0] if isinstance(movie_id, pd.Series) else movie_id.iloc[0,0]
-    
-    try: movie_id = int(movie_id)
-    except (ValueError, TypeError):
-        print(f"Invalid movie ID format: {movie_id}")
-        return {
-            'tmdb_poster_path': None, 'tmdb_year': 'Unknown', 'tmdb_genres': [],
-            'tmdb_vote_average': None, 'tmdb_vote_count': None, 'tmdb_collection_id': None,
-            'tmdb_original_language': 'N/A'
-        }
-    
+            os.makedirs(os.path.dirname(table_path), exist_ok=True)
+            with open(table_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'stemmer': stemmer_id, 'stems': stems}, f, ensure_ascii=False)
+            os.replace(table_path + '.tmp', table_path)
+        except OSError as e:
+            print(f"Warning: Could not save stem table: {e}")
+    return [" ".join([stems[token] for token in tokens]) for tokens in token_lists]
+
+class TokenBucket:
+    """Thread-safe token bucket shared by concurrent TMDB workers.
+
+    acquire() blocks until a request may be sent; pause() stops all workers for a
+    server-provided Retry-After before tokens start refilling again.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.resume_at:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.resume_at - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.resume_at
+
+def parse_retry_after(value, default):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+def fetch_tmdb_movie(movie_id, limiter=None, session=None, retries=3, base_delay=2,
+                     rate_limit_retries=TMDB_RATE_LIMIT_RETRIES):
+    """Fetch the raw TMDB movie JSON.
+
+    Returns (status, data) where status is 'ok', 'not_found' (TMDB has no such id,
+    not retried) or 'failed' (network/server errors after `retries` attempts, or still
+    rate limited after `rate_limit_retries` 429 responses).
+    A 429 pauses the shared limiter for Retry-After and does not use up an attempt.
+    """
+    session = session or enrichment_session
     url = f"{TMDB_BASE_URL}/movie/{movie_id}?api_key={TMDB_API_KEY}&language=en-US"
-    retries = 3 ; base_delay = 2
-    for attempt in range(retries):
+    attempt = 0
+    rate_limited = 0
+    while attempt < retries:
+        if limiter is not None:
+            limiter.acquire()
         try:
-            response = requests_session.get(url, timeout=10)
+            response = session.get(url, timeout=10)
             if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', base_delay))
+                rate_limited += 1
+                if rate_limited > rate_limit_retries:
+                    print(f"ERROR: Still rate limited for movie ID {movie_id} after {rate_limit_retries} retries. Giving up.")
+                    return 'failed', None
+                retry_after = parse_retry_after(response.headers.get('Retry-After'), base_delay)
                 print(f"Rate limited. Waiting {retry_after} seconds before retry...")
-                time.sleep(retry_after) ; continue
+                if limiter is not None:
+                    limiter.pause(retry_after)
+                else:
+                    time.sleep(retry_after)
+                continue
+            if response.status_code == 404:
+                return 'not_found', None
             response.raise_for_status()
-            data = response.json()
-            poster_path = data.get('poster_path')
-            release_date = data.get('release_date')
-            year = release_date.split('-')[0] if release_date else 'Unknown'
-            genres = [g['name'] for g in data.get('genres', [])]
-            vote_average = data.get('vote_average')
-            vote_count = data.get('vote_count')
-            original_language = data.get('original_language', 'N/A')
-            collection_info = data.get('belongs_to_collection')
-            collection_id = collection_info.get('id') if collection_info else None
-            return {
-                'tmdb_poster_path': poster_path, 'tmdb_year': year, 'tmdb_genres': genres,
-                'tmdb_vote_average': vote_average, 'tmdb_vote_count': vote_count,
-                'tmdb_collection_id': collection_id, 'tmdb_original_language': original_language
-            }
-        except requests.exceptions.RequestException as e:
-            if attempt < retries - 1:
-                current_delay = base_delay * (attempt + 1)
-                print(f"WARNING: API call failed for movie ID {movie_id} (Attempt {attempt + 1}/{retries}). Retrying in {current_delay}s. Error: {str(e)}")
+            return 'ok', response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            attempt += 1
+            if attempt < retries:
+                current_delay = base_delay * attempt
+                print(f"WARNING: API call failed for movie ID {movie_id} (Attempt {attempt}/{retries}). Retrying in {current_delay}s. Error: {str(e)}")
                 time.sleep(current_delay)
             else:
                 print(f"ERROR: API call failed permanently for movie ID {movie_id} after {retries} attempts. Error: {str(e)}")
-                return {
-                    'tmdb_poster_path': None, 'tmdb_year': 'Unknown', 'tmdb_genres': [],
-                    'tmdb_vote_average': None, 'tmdb_vote_count': None, 'tmdb_collection_id': None,
-                    'tmdb_original_language': 'N/A'
-                }
+    return 'failed', None
+
+def parse_tmdb_details(data):
+    """Map a TMDB movie payload to the enrichment columns."""
+    release_date = data.get('release_date')
+    collection_info = data.get('belongs_to_collection')
     return {
-        'tmdb_poster_path': None, 'tmdb_year': 'Unknown', 'tmdb_genres': [],
-        'tmdb_vote_average': None, 'tmdb_vote_count': None, 'tmdb_collection_id': None,
-        'tmdb_original_language': 'N/A'
+        'tmdb_poster_path': data.get('poster_path'),
+        'tmdb_year': release_date.split('-')[0] if release_date else 'Unknown',
+        'tmdb_genres': [g['name'] for g in data.get('genres', [])],
+        'tmdb_vote_average': data.get('vote_average'),
+        'tmdb_vote_count': data.get('vote_count'),
+        'tmdb_collection_id': collection_info.get('id') if collection_info else None,
+        'tmdb_original_language': data.get('original_language', 'N/A'),
     }
 
+def open_enrichment_checkpoints(path=enrichment_checkpoint_path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS tmdb_enrichment ("
+        "movie_id INTEGER PRIMARY KEY, status TEXT NOT NULL, fetched_at REAL NOT NULL, payload TEXT)"
+    )
+    return conn
+
+def load_enrichment_checkpoints(conn):
+    """{movie_id: (status, fetched_at, payload JSON or None)} for every checkpointed movie."""
+    return {row[0]: row[1:] for row in conn.execute("SELECT movie_id, status, fetched_at, payload FROM tmdb_enrichment")}
+
+def save_enrichment_checkpoints(conn, rows):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO tmdb_enrichment (movie_id, status, fetched_at, payload) VALUES (?, ?, ?, ?)", rows
+        )
+
+def needs_enrichment(checkpoint, stale_before):
+    """Fetch when never seen, previously failed, or older than ENRICHMENT_MAX_AGE_DAYS."""
+    return checkpoint is None or checkpoint[0] == 'failed' or checkpoint[1] < stale_before
+
+# --- Request Coalescing ---
+class SingleFlight:
+    """Share one in-flight call among concurrent callers asking for the same key.
+
+    Per process: the first caller runs the function, the others wait on its Event and
+    receive the same result (or exception). Counters are reported by /metrics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            self.stats['calls'] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'event': threading.Event(), 'result': None, 'error': None}
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            try:
+                call['result'] = fn(*args, **kwargs)
+            except Exception as e:
+                call['error'] = e
+                with self.lock:
+                    self.stats['errors'] += 1
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call['event'].set()
+        else:
+            call['event'].wait()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, in_flight=len(self.calls))
+
+tmdb_details_flight = SingleFlight('movie_details')
+
+# --- TMDB Details Cache ---
+_details_cache_local = threading.local()
+_details_refreshing = set()
+_details_refreshing_lock = threading.Lock()
+
+def details_cache_connection():
+    """Per-thread (and per-process, after a Gunicorn fork) connection to the shared SQLite cache."""
+    conn = getattr(_details_cache_local, 'conn', None)
+    if conn is None or _details_cache_local.pid != os.getpid():
+        conn = sqlite3.connect(details_cache_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tmdb_details ("
+            "tmdb_id INTEGER PRIMARY KEY, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS tmdb_details_accessed ON tmdb_details (accessed_at)")
+        _details_cache_local.conn, _details_cache_local.pid = conn, os.getpid()
+    return conn
+
+def details_cache_get(tmdb_id):
+    """(payload, fetched_at) for a cached response, or None.
+
+    Marks the entry as recently used, but only writes when its accessed_at is older than
+    DETAILS_CACHE_TOUCH_INTERVAL, so repeated views do not take the shared write lock.
+    """
+    try:
+        conn = details_cache_connection()
+        row = conn.execute(
+            "SELECT payload, fetched_at, accessed_at FROM tmdb_details WHERE tmdb_id = ?", (tmdb_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] >= DETAILS_CACHE_TOUCH_INTERVAL:
+            with conn:
+                conn.execute("UPDATE tmdb_details SET accessed_at = ? WHERE tmdb_id = ?", (now, tmdb_id))
+        return json.loads(row[0]), row[1]
+    except sqlite3.Error as e:
+        print(f"Warning: details cache read failed: {e}")
+        return None
+
+def details_cache_put(tmdb_id, data):
+    try:
+        conn = details_cache_connection()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tmdb_details (tmdb_id, fetched_at, accessed_at, payload) VALUES (?, ?, ?, ?)",
+                (tmdb_id, now, now, json.dumps(data))
+            )
+            conn.execute(
+                "DELETE FROM tmdb_details WHERE tmdb_id IN "
+                "(SELECT tmdb_id FROM tmdb_details ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (DETAILS_CACHE_MAX_ENTRIES,)
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: details cache write failed: {e}")
+
+def fetch_tmdb_movie_details(tmdb_id):
+    """Raw TMDB movie payload with credits and reviews; raises on request errors."""
+    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US&append_to_response=credits,reviews"
+    resp = requests_session.get(url, timeout=12)
+    resp.raise_for_status()
+    data = resp.json()
+    details_cache_put(tmdb_id, data)
+    return data
+
+def _refresh_movie_details(tmdb_id):
+    try:
+        tmdb_details_flight.do(tmdb_id, fetch_tmdb_movie_details, tmdb_id)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Warning: background refresh failed for movie ID {tmdb_id}: {e}")
+    finally:
+        with _details_refreshing_lock:
+            _details_refreshing.discard(tmdb_id)
+
+def get_tmdb_movie_details(tmdb_id):
+    """TMDB details through the disk cache (TTL, stale-while-revalidate, stale-if-error)."""
+    cached = details_cache_get(tmdb_id)
+    if cached is not None:
+        data, fetched_at = cached
+        age = time.time() - fetched_at
+        if age < DETAILS_CACHE_TTL_SECONDS:
+            return data
+        if age < DETAILS_CACHE_TTL_SECONDS + DETAILS_CACHE_STALE_SECONDS:
+            with _details_refreshing_lock:
+                start_refresh = tmdb_id not in _details_refreshing
+                _details_refreshing.add(tmdb_id)
+            if start_refresh:
+                threading.Thread(target=_refresh_movie_details, args=(tmdb_id,), daemon=True).start()
+            return data
+    try:
+        return tmdb_details_flight.do(tmdb_id, fetch_tmdb_movie_details, tmdb_id)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        if cached is None:
+            raise
+        print(f"Warning: TMDB request failed for movie ID {tmdb_id}, serving cached details: {e}")
+        return cached[0]
+
 def enrich_data_with_tmdb_api(initial_df):
     if TMDB_API_KEY == TMDB_API_KEY_PLACEHOLDER or not TMDB_API_KEY:
         print("TMDb API Key not configured. Skipping API enrichment.")
-        initial_df['tmdb_poster_path'] = None
-        initial_df['tmdb_year'] = 'Unknown'
-        initial_df['tmdb_genres'] = [[] for _ in range(len(initial_df))]
-        initial_df['tmdb_vote_average'] = None
-        initial_df['tmdb_vote_count'] = None
-        initial_df['tmdb_collection_id'] = None
-        initial_df['tmdb_original_language'] = 'N/A'
+        for col, value in TMDB_DEFAULT_DETAILS.items():
+            initial_df[col] = [[] for _ in range(len(initial_df))] if isinstance(value, list) else value
         return initial_df
 
     print("Starting TMDb data enrichment...")
     
     # Create a working copy
-    working_df = initial_df.copy()
+    working_df = initial_df.reset_index(drop=True)
     
     # Ensure movie_id exists and is properly formatted
     if 'movie_id' not in working_df.columns:
@@ -293,73 +865,763 @@ def enrich_data_with_tmdb_api(initial_df):
     if nan_mask.any():
         working_df.loc[nan_mask, 'movie_id'] = working_df.loc[nan_mask, 'movie_id_str'].apply(hash)
     
-    # Process all movies
-    enriched_data_rows = []
+    # Only movies without a fresh checkpoint cost an API call
+    movie_ids = [int(original_id) if str(original_id).isdigit() else None for original_id in working_df['movie_id_str']]
+    conn = open_enrichment_checkpoints()
+    try:
+        checkpoints = load_enrichment_checkpoints(conn)
+        stale_before = time.time() - ENRICHMENT_MAX_AGE_DAYS * 86400
+        to_fetch = sorted({mid for mid in movie_ids if mid is not None and needs_enrichment(checkpoints.get(mid), stale_before)})
+        print(f"{len(checkpoints)} movies checkpointed, fetching {len(to_fetch)} missing/stale/failed from TMDb")
+        
+        # Bounded worker pool; the token bucket keeps the combined request rate under TMDB's limit.
+        # Results are checkpointed every ENRICHMENT_BATCH_SIZE movies, so a crash loses at most one batch.
+        limiter = TokenBucket(TMDB_RATE_LIMIT_PER_SECOND, capacity=ENRICHMENT_WORKERS)
+        started = time.time()
+        pending = []
+        with ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS) as pool:
+            futures = {pool.submit(fetch_tmdb_movie, mid, limiter): mid for mid in to_fetch}
+            for done, future in enumerate(as_completed(futures), 1):
+                mid = futures[future]
+                status, data = future.result()
+                previous = checkpoints.get(mid)
+                # A failed refresh keeps the last good payload; it is retried on the next run
+                if status == 'failed' and previous is not None and previous[0] == 'ok':
+                    continue
+                checkpoints[mid] = (status, time.time(), json.dumps(data) if data is not None else None)
+                pending.append((mid,) + checkpoints[mid])
+                if len(pending) >= ENRICHMENT_BATCH_SIZE:
+                    save_enrichment_checkpoints(conn, pending)
+                    pending = []
+                    print(f"Processed {done}/{len(futures)} movies...")
+        save_enrichment_checkpoints(conn, pending)
+    finally:
+        conn.close()
+    
+    # Columnar buffers, pre-filled with defaults (non-numeric IDs and failed fetches keep them)
     total_movies = len(working_df)
+    columns = {col: [value] * total_movies for col, value in TMDB_DEFAULT_DETAILS.items()}
+    columns['tmdb_genres'] = [[] for _ in range(total_movies)]
+    parsed = {}
+    for pos, mid in enumerate(movie_ids):
+        checkpoint = checkpoints.get(mid)
+        if checkpoint is None or checkpoint[0] != 'ok':
+            continue
+        if mid not in parsed:
+            parsed[mid] = parse_tmdb_details(json.loads(checkpoint[2]))
+        for col, value in parsed[mid].items():
+            columns[col][pos] = list(value) if isinstance(value, list) else value
     
-    for i, (_, row) in enumerate(working_df.iterrows()):
-        movie_id = row['movie_id']
-        original_id = row['movie_id_str']
-        
-        # Try to fetch details for numeric IDs
-        if str(original_id).isdigit():
-            details = fetch_and_parse_tmdb_details(int(original_id))
+    for col, values in columns.items():
+        working_df[col] = values
+    print(f"Enrichment complete. Processed {total_movies} movies in {time.time() - started:.1f}s.")
+    return working_df
+
+def build_neighbor_index(vectors, k=NEIGHBOR_K, chunk_size=NEIGHBOR_CHUNK_SIZE):
+    """Build a top-K cosine neighbor index without materializing the full N x N matrix.
+
+    `vectors` must be L2-normalized rows, so a dot product is the cosine similarity.
+    Returns a dict of two (N, K) arrays: 'indices' holds neighbor row positions
+    (padded with -1) and 'scores' the matching similarities, best first.
+    """
+    n = vectors.shape[0]
+    k = max(0, min(k, n - 1))
+    indices = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return {'indices': indices, 'scores': scores}
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        block = (vectors[start:stop] @ vectors.T).toarray()
+        # A movie is never its own neighbor
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        # Order by score (desc), breaking ties by row position for deterministic output
+        order = np.lexsort((top, -top_scores), axis=1)
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+        print(f"Neighbor index: {stop}/{n} movies")
+
+    return {'indices': indices, 'scores': scores}
+
+def file_sha256(path, known=None):
+    """Content hash of a build input; reuses `known` (a previous manifest entry) when size and mtime match."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if known and known.get('size') == stat.st_size and known.get('mtime') == stat.st_mtime:
+        return known
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return {'sha256': digest.hexdigest(), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def artifact_fingerprint(previous=None):
+    """Everything the build output depends on: input CSV hashes, preprocessing parameters, schema version.
+
+    Only parameters that shape the artifacts are listed; PROCESS_ALL_MOVIES reaches them
+    through max_features and max_movies.
+    """
+    previous_inputs = (previous or {}).get('inputs', {})
+    rules = json.dumps([MOOD_GENRE_RULES, CATEGORY_GENRE_RULES, sorted(PROFANITY_LIST)], sort_keys=True)
+    return {
+        'schema_version': ARTIFACT_SCHEMA_VERSION,
+        'inputs': {
+            os.path.basename(path): file_sha256(path, previous_inputs.get(os.path.basename(path)))
+            for path in (movies_csv_path, credits_csv_path, enriched_data_path)
+        },
+        'params': {
+            'max_features': VECTORIZER_MAX_FEATURES,
+            'max_movies': MAX_MOVIES,
+            'stemmer': f"nltk.PorterStemmer/{nltk.__version__}",
+            'mood_rules_sha256': hashlib.sha256(rules.encode('utf-8')).hexdigest(),
+            'engine': RECOMMENDATION_ENGINE,
+            'neighbor_k': NEIGHBOR_K if RECOMMENDATION_ENGINE == 'index' else None,
+        },
+    }
+
+def artifacts_are_current(manifest, current):
+    """True when the manifest was built from the current parameters and inputs.
+
+    Inputs absent on this machine are not compared, so prebuilt artifacts still load
+    on deployments that do not ship the source CSVs. With no input present at all there is
+    nothing to rebuild from, so the build parameters recorded in the manifest are trusted.
+    """
+    if manifest.get('schema_version') != current['schema_version']:
+        return False
+    if all(info is None for info in current['inputs'].values()):
+        if manifest.get('params') != current['params']:
+            print(f"No input CSVs to rebuild from; using the prebuilt artifacts as built with {manifest.get('params')}")
+        return True
+    if manifest.get('params') != current['params']:
+        return False
+    built_inputs = manifest.get('inputs', {})
+    for name, info in current['inputs'].items():
+        built = built_inputs.get(name)
+        if info is not None and (built is None or built['sha256'] != info['sha256']):
+            return False
+    return True
+
+def save_artifacts(df, arrays, fingerprint, artifacts_dir=model_artifacts_dir):
+    """Write the processed table as Parquet and the model arrays as raw .npy files, then the manifest."""
+    os.makedirs(artifacts_dir, exist_ok=True)
+    manifest = dict(fingerprint, created_at=datetime.now().isoformat(), arrays={})
+    list_columns = [col for col in df.columns if df[col].map(lambda v: isinstance(v, list)).any()]
+    table_tmp = os.path.join(artifacts_dir, movies_table_file + '.tmp')
+    df.reset_index(drop=True).to_parquet(table_tmp, engine='pyarrow', index=False)
+    os.replace(table_tmp, os.path.join(artifacts_dir, movies_table_file))
+    manifest['table'] = {'file': movies_table_file, 'rows': len(df), 'list_columns': list_columns}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        file_name = f"{name}.npy"
+        tmp_path = os.path.join(artifacts_dir, file_name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp_path, os.path.join(artifacts_dir, file_name))
+        manifest['arrays'][name] = {'file': file_name, 'dtype': str(arr.dtype), 'shape': list(arr.shape)}
+    # The manifest is written last so a crashed build never looks complete
+    manifest_path = os.path.join(artifacts_dir, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+def read_artifact_manifest(artifacts_dir=model_artifacts_dir):
+    try:
+        with open(os.path.join(artifacts_dir, 'manifest.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_legacy_processed_data(path=legacy_processed_data_path, version_file=legacy_cache_version_file):
+    """Processed table from the old pickle cache, or None when it is missing, outdated or unreadable.
+
+    Lets a deployment that ships only the pickle (no CSVs, no data/model yet) build its
+    artifacts from it. Its tags are already stemmed; tmdb_genres may still be raw reprs.
+    """
+    try:
+        with open(version_file, 'r') as f:
+            if f.read().strip() != LEGACY_CACHE_VERSION:
+                return None
+        with open(path, 'rb') as f:
+            legacy = pickle.load(f)
+    except Exception as e:
+        print(f"No usable legacy cache at {path}: {e}")
+        return None
+    legacy = legacy.reset_index(drop=True)
+    legacy['tmdb_genres'] = [extract_names(parse_json_cell(v)) for v in legacy['tmdb_genres']]
+    for col in ('cast', 'crew'):
+        legacy[col] = [list(v) if isinstance(v, list) else [] for v in legacy[col]]
+    return legacy
+
+def load_artifacts(manifest, artifacts_dir=model_artifacts_dir):
+    """Read the processed table and open the model arrays read-only with mmap,
+    so all workers share one page-cache copy."""
+    table = manifest['table']
+    df = pd.read_parquet(os.path.join(artifacts_dir, table['file']), engine='pyarrow', memory_map=True)
+    # Parquet hands list columns back as arrays; the API code expects plain lists
+    for col in table['list_columns']:
+        df[col] = [v.tolist() if isinstance(v, np.ndarray) else [] for v in df[col]]
+    arrays = {
+        name: np.load(os.path.join(artifacts_dir, meta['file']), mmap_mode='r')
+        for name, meta in manifest['arrays'].items()
+    }
+    return df, arrays
+
+def model_arrays_from_build(df, features, neighbors=None, tables=None, franchises=None):
+    """Collect the numeric arrays that are persisted next to the processed DataFrame."""
+    # Keep index arrays 32-bit when possible so scipy can wrap the memory maps without copying
+    index_dtype = np.int32 if features.nnz < np.iinfo(np.int32).max else np.int64
+    arrays = {
+        'vote_average': pd.to_numeric(df['tmdb_vote_average'], errors='coerce').to_numpy(dtype=np.float64),
+        'vote_count': pd.to_numeric(df['tmdb_vote_count'], errors='coerce').to_numpy(dtype=np.float64),
+        'is_blocked': df['is_blocked'].to_numpy(dtype=bool),
+        'feature_data': features.data.astype(np.float32),
+        'feature_indices': features.indices.astype(index_dtype),
+        'feature_indptr': features.indptr.astype(index_dtype),
+        'feature_shape': np.array(features.shape, dtype=np.int64),
+    }
+    if neighbors is not None:
+        arrays['neighbor_indices'] = neighbors['indices']
+        arrays['neighbor_scores'] = neighbors['scores']
+    arrays.update(pack_result_tables(tables or {}))
+    arrays.update(franchises or {})
+    return arrays
+
+def pack_result_tables(tables):
+    """Flatten {key: ranked rows} into key/offset/row arrays that can be memory-mapped."""
+    keys = sorted(tables)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(tables[k]) for k in keys])
+    rows = np.concatenate([tables[k] for k in keys]) if keys else np.empty(0)
+    return {
+        'result_table_keys': np.array(keys, dtype=str),
+        'result_table_offsets': offsets,
+        'result_table_rows': rows.astype(np.int32),
+    }
+
+def unpack_result_tables(arrays):
+    keys, offsets, rows = arrays['result_table_keys'], arrays['result_table_offsets'], arrays['result_table_rows']
+    return {str(key): rows[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+def attach_model_arrays(arrays):
+    """Point the module-level engine state at a set of (usually memory-mapped) model arrays."""
+    global model_arrays, neighbor_index, feature_matrix, result_tables
+    if RECOMMENDATION_ENGINE == 'index' and 'neighbor_indices' not in arrays:
+        raise ValueError("Model artifacts have no neighbor index; rebuild with RECOMMENDATION_ENGINE=index")
+    if 'franchise_group' not in arrays:
+        raise ValueError("Model artifacts have no franchise index; rebuild required")
+    model_arrays = arrays
+    result_tables = unpack_result_tables(arrays)
+    neighbor_index = None
+    if 'neighbor_indices' in arrays:
+        neighbor_index = {'indices': arrays['neighbor_indices'], 'scores': arrays['neighbor_scores']}
+    feature_matrix = csr_matrix(
+        (arrays['feature_data'], arrays['feature_indices'], arrays['feature_indptr']),
+        shape=tuple(int(x) for x in arrays['feature_shape']),
+        copy=False
+    )
+    return model_arrays
+
+def get_similar_movies_batch(idxs, k=NEIGHBOR_K):
+    """Return (row positions, scores) of the movies most similar to each row in idxs.
+
+    Both are (len(idxs), k) arrays, one line per idx, best first. The 'index' engine gathers
+    the precomputed neighbor lines in one fancy-index read; the 'sparse' engine scores every
+    query with a single sparse-dense product F @ F[idxs].T.
+    """
+    idxs = np.asarray(idxs, dtype=np.int64)
+    if RECOMMENDATION_ENGINE == 'index':
+        return neighbor_index['indices'][idxs], neighbor_index['scores'][idxs]
+
+    queries = feature_matrix[idxs].toarray().T
+    scores = np.ascontiguousarray((feature_matrix @ queries).T)
+    scores[np.arange(len(idxs)), idxs] = -np.inf
+    k = max(0, min(k, scores.shape[1] - 1))
+    if k == 0:
+        return np.empty((len(idxs), 0), dtype=np.int32), np.empty((len(idxs), 0), dtype=np.float32)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores), axis=-1)
+    return np.take_along_axis(top, order, axis=1).astype(np.int32), np.take_along_axis(top_scores, order, axis=1)
+
+def normalize_genres(genres):
+    """Lowercased genre names of one movie; tmdb_genres may be missing or malformed."""
+    if not isinstance(genres, list):
+        return []
+    return [g.lower() for g in genres if isinstance(g, str)]
+
+def build_genre_index(genre_lists):
+    """Encode each movie's genres as a bitset over the sorted genre vocabulary.
+
+    Returns (vocab, bits) where vocab maps a lowercased genre to its bit number and
+    bits is an (N, W) uint64 array holding 64 genres per word.
+    """
+    normalized = [normalize_genres(gs) for gs in genre_lists]
+    vocab = {g: i for i, g in enumerate(sorted({g for gs in normalized for g in gs}))}
+    n_words = max(1, (len(vocab) + 63) // 64)
+    words = [[0] * n_words for _ in normalized]
+    for row, gs in enumerate(normalized):
+        for g in gs:
+            bit = vocab[g]
+            words[row][bit // 64] |= 1 << (bit % 64)
+    return vocab, np.array(words, dtype=np.uint64).reshape(len(normalized), n_words)
+
+def genre_set_mask(names):
+    """uint64 word mask with the bits of the given genre names (unknown names are ignored)."""
+    vocab = indexes['genre_vocab']
+    words = [0] * indexes['genre_bits'].shape[1]
+    for name in names:
+        bit = vocab.get(name.lower())
+        if bit is not None:
+            words[bit // 64] |= 1 << (bit % 64)
+    return np.array(words, dtype=np.uint64)
+
+def genre_rule_mask(clauses):
+    """Boolean row mask for a conjunctive genre rule such as [['comedy'], ['romance']]."""
+    bits = indexes['genre_bits']
+    mask = np.ones(len(bits), dtype=bool)
+    for clause in clauses:
+        mask &= (bits & genre_set_mask(clause)).any(axis=1)
+    return mask
+
+# Set bits per byte value, for counting shared genres across the uint64 bitsets
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def genre_overlap_counts(rows, base_row):
+    """Number of genres each movie in `rows` shares with `base_row` (bitset AND + popcount).
+
+    With a 2-D `rows`, `base_row` holds one base movie per line.
+    """
+    bits = indexes['genre_bits']
+    rows = np.asarray(rows)
+    base_bits = bits[base_row] if rows.ndim == 1 else bits[np.asarray(base_row)][:, None, :]
+    shared = np.ascontiguousarray(bits[rows] & base_bits)
+    return POPCOUNT_TABLE[shared.view(np.uint8)].reshape(rows.shape + (bits.shape[1] * 8,)).sum(axis=-1, dtype=np.int64)
+
+def build_person_index(name_lists, ranked_rows=None):
+    """Inverted index from lowercased person name to the row positions of their movies.
+
+    Returns a dict with 'postings' (name -> int32 rows in catalog order), 'display' (name -> the
+    spelling first seen in the catalog) and 'names' (sorted keys for prefix lookups).
+    With `ranked_rows`, postings keep only those rows, in that order, and people
+    with none of them are dropped.
+    """
+    rows_by_name = {}
+    display = {}
+    for row, names in enumerate(name_lists):
+        if not isinstance(names, list):
+            continue
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            key = name.lower()
+            rows = rows_by_name.setdefault(key, [])
+            if not rows or rows[-1] != row:
+                rows.append(row)
+            display.setdefault(key, name)
+    postings = {key: np.array(rows, dtype=np.int32) for key, rows in rows_by_name.items()}
+    if ranked_rows is not None:
+        position = np.full(len(name_lists), -1, dtype=np.int64)
+        position[ranked_rows] = np.arange(len(ranked_rows))
+        for key, rows in postings.items():
+            ranks = position[rows]
+            postings[key] = rows[np.argsort(ranks, kind='stable')][np.count_nonzero(ranks < 0):]
+        # People left with no listed movies are not suggested
+        postings = {key: rows for key, rows in postings.items() if len(rows)}
+        display = {key: display[key] for key in postings}
+    return {'postings': postings, 'display': display, 'names': sorted(postings)}
+
+def person_prefix_matches(person_index, prefix, limit=10):
+    """Display names of people whose lowercased name starts with prefix, alphabetically."""
+    names = person_index['names']
+    matches = []
+    for i in range(bisect_left(names, prefix), len(names)):
+        if len(matches) >= limit or not names[i].startswith(prefix):
+            break
+        matches.append(person_index['display'][names[i]])
+    return matches
+
+def build_title_index(titles, popularity, ngram_size=TITLE_NGRAM_SIZE):
+    """Substring index over the distinct lowercased titles, ranked by popularity.
+
+    Titles are stored most popular first (by vote count, then alphabetically), so every
+    postings list - one per substring of length 1..ngram_size - is already in rank order.
+    'rows' holds the first DataFrame row position of each title.
+    """
+    first_row, best_popularity, display = {}, {}, {}
+    for row, (title, votes) in enumerate(zip(titles, popularity)):
+        if not isinstance(title, str):
+            continue
+        key = title.lower()
+        votes = float(votes) if pd.notna(votes) else -1.0
+        if key not in first_row:
+            first_row[key] = row
+            best_popularity[key] = votes
+            display[key] = title
+        elif votes > best_popularity[key]:
+            best_popularity[key] = votes
+            display[key] = title
+
+    keys = sorted(first_row, key=lambda k: (-best_popularity[k], k))
+    grams = {}
+    for pos, key in enumerate(keys):
+        seen = set()
+        for n in range(1, ngram_size + 1):
+            for i in range(len(key) - n + 1):
+                gram = key[i:i + n]
+                if gram not in seen:
+                    seen.add(gram)
+                    grams.setdefault(gram, []).append(pos)
+    return {
+        'keys': keys,
+        'display': [display[k] for k in keys],
+        'rows': np.array([first_row[k] for k in keys], dtype=np.int32),
+        'lengths': np.array([len(k) for k in keys], dtype=np.int32),
+        'postings': {gram: np.array(positions, dtype=np.int32) for gram, positions in grams.items()},
+        'ngram_size': ngram_size,
+    }
+
+def suggest_titles(query, limit=10):
+    """Most popular titles containing query (case-insensitive).
+
+    Short queries are answered straight from their own postings list. Longer ones scan
+    the rarest of their n-grams in rank order and stop after `limit` verified hits.
+    """
+    title_index = indexes['titles']
+    n = title_index['ngram_size']
+    q = query.lower()
+    if len(q) <= n:
+        return [title_index['display'][pos] for pos in title_index['postings'].get(q, [])[:limit]]
+
+    postings = []
+    for i in range(len(q) - n + 1):
+        plist = title_index['postings'].get(q[i:i + n])
+        if plist is None:
+            return []
+        postings.append(plist)
+    suggestions = []
+    for pos in min(postings, key=len):
+        if q in title_index['keys'][pos]:
+            suggestions.append(title_index['display'][pos])
+            if len(suggestions) >= limit:
+                break
+    return suggestions
+
+def resolve_fuzzy_title(query, cutoff=FUZZY_CUTOFF, max_candidates=FUZZY_CANDIDATES):
+    """Closest catalog title to a misspelled query as (row position, confidence in [0, 1]).
+
+    Candidates are shortlisted by the Dice overlap of their n-grams with the query, and only
+    that bounded shortlist is scored with difflib's ratio (the get_close_matches metric).
+    Trigrams are tried first, then shorter n-grams for heavily mangled queries.
+    Returns (None, 0.0) when nothing reaches cutoff.
+    """
+    title_index = indexes['titles']
+    q = query.lower()
+    for n in range(min(title_index['ngram_size'], len(q)), 0, -1):
+        pos, score = _best_fuzzy_candidate(title_index, q, n, cutoff, max_candidates)
+        if pos is not None:
+            return int(title_index['rows'][pos]), score
+    return None, 0.0
+
+def _best_fuzzy_candidate(title_index, q, n, cutoff, max_candidates):
+    grams = {q[i:i + n] for i in range(len(q) - n + 1)}
+    postings = sorted((title_index['postings'][g] for g in grams if g in title_index['postings']), key=len)
+    if not postings:
+        return None, 0.0
+    # Rare n-grams are the discriminative ones; stop adding lists once the budget is spent
+    used, total = 1, len(postings[0])
+    while used < len(postings) and total + len(postings[used]) <= FUZZY_POSTINGS_BUDGET:
+        total += len(postings[used])
+        used += 1
+
+    candidates, shared = np.unique(np.concatenate(postings[:used]), return_counts=True)
+    title_grams = np.maximum(title_index['lengths'][candidates] - n + 1, 1)
+    dice = 2.0 * shared / (used + title_grams)
+    if len(candidates) > max_candidates:
+        top = np.argpartition(-dice, max_candidates - 1)[:max_candidates]
+        candidates, dice = candidates[top], dice[top]
+    # Best overlap first, so the running best score prunes most of the expensive ratio() calls
+    candidates = candidates[np.argsort(-dice, kind='stable')]
+
+    matcher = SequenceMatcher()
+    matcher.set_seq2(q)
+    best = (cutoff, '', None)
+    for pos in candidates:
+        key = title_index['keys'][pos]
+        matcher.set_seq1(key)
+        # real_quick_ratio() and quick_ratio() are cheap upper bounds on ratio()
+        if matcher.real_quick_ratio() < best[0] or matcher.quick_ratio() < best[0]:
+            continue
+        # Same tie-break as get_close_matches: highest score, then greatest title
+        candidate = (matcher.ratio(), key, pos)
+        if candidate[:2] >= best[:2]:
+            best = candidate
+    return best[2], (best[0] if best[2] is not None else 0.0)
+
+def build_key_index(df):
+    """Primary-key maps from movie_id and from normalized title to row position.
+
+    When several rows share a key the first row wins, matching the old `.iloc[0]` lookups.
+    """
+    id_to_row = {}
+    for row, movie_id in enumerate(pd.to_numeric(df['movie_id'], errors='coerce')):
+        if pd.notna(movie_id):
+            id_to_row.setdefault(int(movie_id), row)
+    title_to_row = {}
+    for row, title in enumerate(df['title']):
+        if isinstance(title, str):
+            title_to_row.setdefault(title.lower().strip(), row)
+    return id_to_row, title_to_row
+
+def find_movie_row(movie_id=None, title=None):
+    """Row position of a movie by movie_id (preferred) or case-insensitive title, or None."""
+    if movie_id is not None:
+        # int() would truncate 1.7 to 1 and accept True as 1
+        if isinstance(movie_id, bool) or (isinstance(movie_id, float) and not movie_id.is_integer()):
+            return None
+        try:
+            return indexes['id_to_row'].get(int(movie_id))
+        except (ValueError, TypeError):
+            return None
+    if title:
+        return indexes['title_to_row'].get(str(title).strip().lower())
+    return None
+
+def rank_movie_rows(df, mask, min_votes=10, blocked=None):
+    """Row positions selected by mask with at least min_votes, best rated first.
+
+    Ordered by (tmdb_vote_average desc, tmdb_vote_count desc) with missing ratings last and
+    ties kept in catalog order. Rows flagged in `blocked` (e.g. profane titles) are dropped.
+    """
+    vote_average = pd.to_numeric(df['tmdb_vote_average'], errors='coerce').to_numpy(dtype=np.float64)
+    vote_count = pd.to_numeric(df['tmdb_vote_count'], errors='coerce').to_numpy(dtype=np.float64)
+    mask = np.asarray(mask, dtype=bool) & (vote_count >= min_votes)
+    if blocked is not None:
+        mask &= ~blocked
+    rows = np.flatnonzero(mask)
+    rating_key = np.where(np.isnan(vote_average[rows]), np.inf, -vote_average[rows])
+    return rows[np.lexsort((-vote_count[rows], rating_key))].astype(np.int32)
+
+def build_result_tables(df):
+    """Materialize the ranked results of every mood, browse category and genre.
+
+    Keys are 'mood:<mood>' (/moodwise_text_input), 'category:<category>'
+    (/get_movies_by_mood_category), 'genre:<genre>' (/get_movies_by_genre) and 'top' (/top_watched).
+    Needs the genre index, so call it after build_lookup_indexes().
+    """
+    blocked = df['is_blocked'].to_numpy(dtype=bool)
+    vote_average = pd.to_numeric(df['tmdb_vote_average'], errors='coerce').to_numpy(dtype=np.float64)
+    tables = {}
+    for mood, rule in MOOD_GENRE_RULES.items():
+        mask = genre_rule_mask(rule)
+        # If too few thought-provoking titles, also include highly-rated dramas (8.0+)
+        if mood == 'Thought-Provoking' and mask.sum() < 10:
+            mask |= genre_rule_mask([['drama']]) & (vote_average >= 8.0)
+        tables[f'mood:{mood}'] = rank_movie_rows(df, mask, blocked=blocked)
+    for category, rule in CATEGORY_GENRE_RULES.items():
+        tables[f'category:{category}'] = rank_movie_rows(df, genre_rule_mask(rule), blocked=blocked)
+    for category in df['mood_category'].dropna().unique():
+        if category not in CATEGORY_GENRE_RULES:
+            tables[f'category:{category}'] = rank_movie_rows(df, (df['mood_category'] == category).to_numpy(), blocked=blocked)
+    # Genre browsing and /top_watched have never applied the profanity filter
+    for genre in indexes['genre_vocab']:
+        tables[f'genre:{genre}'] = rank_movie_rows(df, genre_rule_mask([[genre]]))
+    tables['top'] = rank_movie_rows(df, np.ones(len(df), dtype=bool), min_votes=100)
+    print(f"Result tables built: {len(tables)} moods/categories/genres")
+    return tables
+
+# Trailing sequel markers ignored when clustering titles into franchises ("Toy Story 3", "Rocky II", "Part 2")
+SEQUEL_SUFFIX = re.compile(r"(?:\s+(?:part|chapter|vol\.?|volume)?\s*(?:\d{1,2}|viii|vii|iii|ix|iv|vi|ii|v|x))+$")
+
+def franchise_title_stem(title):
+    """Lowercased title before any subtitle (':' or '-'), without sequel numbering."""
+    stem = str(title).lower().split(':')[0].split('-')[0].strip()
+    return SEQUEL_SUFFIX.sub('', stem).strip() or stem
+
+def build_franchise_index(titles, collection_ids, years):
+    """Group movies into franchises: TMDB collections, and title-stem clusters of the rest.
+
+    A movie with a tmdb_collection_id belongs to its collection's group only; movies without
+    one are clustered by franchise_title_stem(). The two groupings are never merged, so a
+    remake or a same-name film cannot pull a collection into another franchise.
+    Returns 'franchise_group' (group id per row) and a CSR layout of the groups,
+    'franchise_offsets' / 'franchise_members', with members ordered by release year
+    (unknown years last, ties in catalog order).
+    """
+    n = len(titles)
+    group_of_key = {}
+    group = np.empty(n, dtype=np.int32)
+    for row, (title, collection_id) in enumerate(zip(titles, collection_ids)):
+        if not np.isnan(collection_id):
+            key = ('collection', collection_id)
         else:
-            # For non-numeric IDs, use default values
-            details = {
-                'tmdb_poster_path': None,
-                'tmdb_year': 'Unknown',
-                'tmdb_genres': [],
-                'tmdb_vote_average': None,
-                'tmdb_vote_count': None,
-                'tmdb_collection_id': None,
-                'tmdb_original_language': 'N/A'
-            }
-        
-        row_dict = row.to_dict()
-        row_dict.update(details)
-        enriched_data_rows.append(row_dict)
-        
-        if (i + 1) % ENRICHMENT_BATCH_SIZE == 0:
-            print(f"Processed {i + 1}/{total_movies} movies...")
-            time.sleep(ENRICHMENT_DELAY_SECONDS)
+            key = ('stem', franchise_title_stem(title) or row)
+        group[row] = group_of_key.setdefault(key, len(group_of_key))
+    members = np.lexsort((np.arange(n), np.where(np.isnan(years), np.inf, years), group)).astype(np.int32)
+    offsets = np.zeros(len(group_of_key) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(group, minlength=len(group_of_key)))
+    print(f"Franchise index built: {int((np.diff(offsets) > 1).sum())} franchises with 2+ movies")
+    return {'franchise_group': group, 'franchise_offsets': offsets, 'franchise_members': members}
+
+def franchise_rows(base_row, limit=3):
+    """Up to `limit` other movies of the base movie's franchise, earliest release first.
+
+    A movie in a TMDB collection gets its collection siblings. Otherwise the candidates are
+    the other collection-less movies with the same title stem that share a genre with it.
+    Titles equal to the base title (ignoring case) are skipped.
+    """
+    group = model_arrays['franchise_group'][base_row]
+    offsets = model_arrays['franchise_offsets']
+    members = np.asarray(model_arrays['franchise_members'][offsets[group]:offsets[group + 1]], dtype=np.int64)
+    members = members[indexes['title_lower_codes'][members] != indexes['title_lower_codes'][base_row]]
+    if np.isnan(indexes['collection_ids'][base_row]):
+        members = members[genre_overlap_counts(members, base_row) > 0]
+    return members[:limit]
+
+def select_similar_rows(base_rows, taken_titles, limits):
+    """Stage 2 of recommend() as array operations over the ranked neighbor candidates.
+
+    Keeps candidates rated >= 5.5 (unknown ratings pass), not blocked, and either sharing a
+    genre with the base movie or scoring > 0.7; then drops titles already taken or repeated.
+    The filters run over the candidates of all `base_rows` at once. Returns one
+    (rows, similarity scores, reasons) per base row, at most its `limits` movies, best first.
+    The sparse engine starts from NEIGHBOR_K candidates and doubles that for the lines where
+    fewer than `limits` pass, until they fill up or the whole catalog has been ranked.
+    """
+    base_rows = np.asarray(base_rows, dtype=np.int64)
+    base_genre_counts = genre_overlap_counts(base_rows, base_rows)  # Distinct genres of each base movie
+    selected = [None] * len(base_rows)
+    pending = np.arange(len(base_rows))
+    k = max(NEIGHBOR_K, 1)
+    while len(pending):
+        candidates, sims = get_similar_movies_batch(base_rows[pending], k)
+        # The neighbor index pads short lines with -1; row 0 stands in until the mask drops them
+        valid = candidates >= 0
+        rows = np.where(valid, candidates, 0)
+        overlap = genre_overlap_counts(rows, base_rows[pending])
+        keep = valid & ~(model_arrays['vote_average'][rows] < 5.5) & ~model_arrays['is_blocked'][rows]
+        keep &= (overlap > 0) | (sims > 0.7)
+        can_widen = RECOMMENDATION_ENGINE != 'index' and candidates.shape[1] == k
+        short = []
+        for i, line in enumerate(pending):
+            taken, limit = taken_titles[line], limits[line]
+            kept = np.flatnonzero(keep[i])
+            # Skip titles already recommended: first occurrence wins, franchise titles are taken up front
+            codes = indexes['title_codes'][rows[i, kept]]
+            _, first = np.unique(codes, return_index=True)
+            first.sort()
+            first = first[~np.isin(codes[first], taken)][:limit]
+            if len(first) < limit and can_widen:
+                short.append(line)
+                continue
+            picked = kept[first]
+            picked_sims = sims[i, picked]
+            reasons = np.where(picked_sims > 0.8, 'Highly Similar',
+                               np.where(overlap[i, picked] >= base_genre_counts[line] * 0.7, 'Similar Genre & Style', 'Similar Content'))
+            selected[line] = (rows[i, picked], picked_sims, reasons)
+        pending = np.array(short, dtype=np.int64)
+        k *= 2
+    return selected
+
+def build_lookup_indexes(df):
+    """Build the in-memory lookup structures the endpoints share, once per loaded model."""
+    global indexes
+    genre_vocab, genre_bits = build_genre_index(df['tmdb_genres'])
+    id_to_row, title_to_row = build_key_index(df)
+    # Person results list movies with 10+ votes, best rated first; postings are kept in that order
+    ranked_rows = rank_movie_rows(df, np.ones(len(df), dtype=bool))
+    indexes = {
+        'id_to_row': id_to_row,
+        'title_to_row': title_to_row,
+        'genre_vocab': genre_vocab,
+        'genre_bits': genre_bits,
+        'people': {
+            'cast': build_person_index(df['cast'], ranked_rows),
+            'director': build_person_index(df['crew'], ranked_rows),
+        },
+        'titles': build_title_index(df['title'], df['tmdb_vote_count']),
+        # Exact and case-insensitive title codes for dedupe, release years (NaN when unknown) for ranking
+        'title_codes': pd.factorize(df['title'])[0].astype(np.int64),
+        'title_lower_codes': pd.factorize(df['title'].str.lower())[0].astype(np.int64),
+        'years': pd.to_numeric(df['tmdb_year'].where(df['tmdb_year'].astype(str).str.isdigit()), errors='coerce').to_numpy(dtype=np.float64),
+        'collection_ids': pd.to_numeric(df['tmdb_collection_id'], errors='coerce').to_numpy(dtype=np.float64),
+    }
+    print(f"Lookup indexes built: {len(genre_vocab)} genres, "
+          f"{len(indexes['people']['cast']['names'])} cast, {len(indexes['people']['director']['names'])} directors")
+    return indexes
+
+def build_model(manifest):
+    """Vectorize the stemmed tags of the global df, build the model arrays and lookup indexes,
+    and cache them as artifacts next to `manifest` (the previous one, if any)."""
+    global df
+    print("Vectorizing tags...")
+    # Use more features when processing all movies, fewer for limited dataset
+    print(f"Using {VECTORIZER_MAX_FEATURES} features for vectorization")
+    cv = CountVectorizer(max_features=VECTORIZER_MAX_FEATURES, stop_words='english')
+    # Keep the count matrix sparse; only its L2-normalized CSR form is kept for scoring
+    features = normalize(cv.fit_transform(df['tags']).astype(np.float32), norm='l2').tocsr()
+    print(f"Feature matrix: {features.shape}, {features.nnz} non-zeros")
+    neighbors = None
+    if RECOMMENDATION_ENGINE == 'index':
+        print(f"Calculating top-{NEIGHBOR_K} cosine neighbors...")
+        neighbors = build_neighbor_index(features)
+        print(f"Neighbor index shape: {neighbors['indices'].shape}")
+    else:
+        print("Sparse engine: similarities are computed on demand, skipping the neighbor index")
+    build_lookup_indexes(df)
+    franchises = build_franchise_index(df['title'], indexes['collection_ids'], indexes['years'])
+    attach_model_arrays(model_arrays_from_build(df, features, neighbors, build_result_tables(df), franchises))
     
-    print(f"Enrichment complete. Processed {len(enriched_data_rows)} movies.")
-    return pd.DataFrame(enriched_data_rows)
+    # Cache the processed data and model artifacts
+    print("Caching processed data and model artifacts...")
+    try:
+        # Hash the inputs as they are now: enrichment may have just written the enriched CSV
+        manifest = save_artifacts(df, model_arrays, artifact_fingerprint(manifest))
+        print(f"Artifacts saved to {model_artifacts_dir}")
+        # Re-open from disk so this process serves the same shared pages as forked workers
+        df, arrays = load_artifacts(manifest)
+        attach_model_arrays(arrays)
+        build_lookup_indexes(df)
+    except Exception as e:
+        print(f"Warning: Could not cache data: {e}")
+    build_movie_cards(df)
+    
+    print("Data loading and model preprocessing complete.")
+    return df, model_arrays
 
-def load_and_preprocess_data():
-    global df, similarity, analyzer
+def load_and_preprocess_data(workers=None):
+    global df, analyzer
     
-    # Check cache version - delete old cache if version mismatch
-    cache_valid = False
-    if os.path.exists(cache_version_file):
-        try:
-            with open(cache_version_file, 'r') as f:
-                cached_version = f.read().strip()
-            if cached_version == CACHE_VERSION:
-                cache_valid = True
-            else:
-                print(f"Cache version mismatch (cached: {cached_version}, current: {CACHE_VERSION}). Rebuilding cache...")
-                # Delete old cache files
-                for cache_file in [processed_data_cache_path, similarity_cache_path]:
-                    if os.path.exists(cache_file):
-                        os.remove(cache_file)
-                        print(f"Deleted old cache file: {cache_file}")
-        except Exception as e:
-            print(f"Error checking cache version: {e}")
+    # Reuse the artifacts when they were built from the same inputs and parameters
+    manifest = read_artifact_manifest()
+    fingerprint = artifact_fingerprint(manifest)
+    if manifest is not None:
+        if artifacts_are_current(manifest, fingerprint):
+            print("Loading processed data and memory-mapped model artifacts...")
+            try:
+                df, arrays = load_artifacts(manifest)
+                attach_model_arrays(arrays)
+                build_lookup_indexes(df)
+                build_movie_cards(df)
+                print("Cached data loaded successfully!")
+                return df, model_arrays
+            except Exception as e:
+                print(f"Error loading cache: {e}. Reprocessing data...")
+        else:
+            print("Inputs or build parameters changed since the artifacts were built. Rebuilding...")
     
-    # Check if cached processed data exists and is valid
-    if cache_valid and os.path.exists(processed_data_cache_path) and os.path.exists(similarity_cache_path):
-        print("Loading cached processed data and similarity matrix...")
-        try:
-            with open(processed_data_cache_path, 'rb') as f:
-                df = pickle.load(f)
-            with open(similarity_cache_path, 'rb') as f:
-                similarity = pickle.load(f)
-            print("Cached data loaded successfully!")
-            return df, similarity
-        except Exception as e:
-            print(f"Error loading cache: {e}. Reprocessing data...")
+    # Deployments from before data/model existed ship only the pickle cache; build from it
+    if all(info is None for info in fingerprint['inputs'].values()):
+        legacy = load_legacy_processed_data()
+        if legacy is not None:
+            print(f"No input CSVs; building artifacts from the legacy cache {legacy_processed_data_path}")
+            df = legacy
+            df['is_blocked'] = df['title'].apply(contains_profanity)
+            return build_model(manifest)
     
     # Load sentiment analyzer
     try:
@@ -433,341 +1695,265 @@ def load_and_preprocess_data():
     # Preserve original overview text for API responses before tokenization
     movies_processed['overview_text'] = df_base['overview'].fillna('').astype(str)
     
-    list_cols = ['overview', 'genres', 'keywords', 'cast', 'crew']
-    for col in list_cols:
-        movies_processed[col] = movies_processed[col].fillna('[]')
-
-    movies_processed.dropna(subset=['overview', 'genres', 'keywords', 'cast', 'crew'], inplace=True)
-    print(f"Processing {len(movies_processed)} movies after dropna...")
-    
-    # Process columns with progress tracking
-    for col in list_cols:
-        print(f"Parsing {col} column...")
-        movies_processed[col] = movies_processed[col].apply(safe_literal_eval)
-
-    # FIX: Apply the specific parsing functions to the appropriate columns
-    movies_processed['genres'] = movies_processed['genres'].apply(fetch_genres)
-    movies_processed['keywords'] = movies_processed['keywords'].apply(fetch_keywords)
-    movies_processed['cast'] = movies_processed['cast'].apply(fetch_cast)
-    movies_processed['crew'] = movies_processed['crew'].apply(fetch_crew)
-
-    # Process overview differently since it's text, not a list
-    movies_processed['overview'] = movies_processed['overview'].apply(
-        lambda x: x.lower().split() if isinstance(x, str) else []
+    workers = max(1, workers or PREPROCESS_WORKERS)
+    movies_processed['sentiment_score'] = score_overview_sentiment(
+        [" ".join(text.lower().split()) for text in movies_processed['overview_text']], workers
     )
 
-    # Create display copies for cast and directors before tokenization
-    movies_processed['cast_display'] = movies_processed['cast'].apply(lambda x: [i for i in x if isinstance(i, str)])
-    movies_processed['directors_display'] = movies_processed['crew'].apply(lambda x: [i for i in x if isinstance(i, str)])
-
-    # Build tokenized lists for modeling/search without altering display names
-    def tokenize_list(lst):
-        return [str(item).replace(" ", "").lower() for item in (lst or []) if item is not None]
-
-    movies_processed['genres_tokens'] = movies_processed['genres'].apply(tokenize_list)
-    movies_processed['keywords_tokens'] = movies_processed['keywords'].apply(tokenize_list)
-    movies_processed['cast_tokens'] = movies_processed['cast_display'].apply(tokenize_list)
-    movies_processed['crew_tokens'] = movies_processed['directors_display'].apply(tokenize_list)
-
-    # Overview tokens
-    movies_processed['overview_tokens'] = movies_processed['overview'].apply(lambda x: [str(tok).lower() for tok in x])
-
-    movies_processed['overview_str'] = movies_processed['overview_tokens'].apply(lambda x: " ".join(x))
-    movies_processed['sentiment_score'] = movies_processed['overview_str'].apply(lambda x: analyzer.polarity_scores(x)['compound'])
-    
-    def get_mood_category(score, tmdb_genres):
-        genres_list = [g.lower() for g in tmdb_genres if isinstance(g, str)] if isinstance(tmdb_genres, list) else []
-        # Highly specific mappings first
-        if 'horror' in genres_list:
-            return 'Horror'
-        if 'mystery' in genres_list or 'crime' in genres_list or 'thriller' in genres_list:
-            return 'Intense/Mystery'
-        # Romcom requires BOTH comedy and romance
-        if 'comedy' in genres_list and 'romance' in genres_list:
-            return 'Romcom'
-        # Romance takes priority over drama
-        if 'romance' in genres_list:
-            return 'Romantic/Dramatic'
-        # Comedy/family/animation for happy mood
-        if 'comedy' in genres_list or 'family' in genres_list or 'animation' in genres_list:
-            return 'Happy'
-        # Sad category based on low sentiment and specific genres
-        if score < -0.3 and ('drama' in genres_list or 'war' in genres_list):
-            return 'Sad'
-        # Drama only if no romance
-        if 'drama' in genres_list:
-            return 'Drama'
-        if 'documentary' in genres_list or 'history' in genres_list:
-            return 'Thought-Provoking'
-        if 'action' in genres_list or 'adventure' in genres_list:
-            return 'Action/Adventure'
-        if 'music' in genres_list or 'fantasy' in genres_list or 'science fiction' in genres_list:
-            return 'Escapist'
-        # Fallback to sentiment (avoid Neutral category)
-        if score >= 0.5:
-            return 'Happy'
-        elif score <= -0.5:
-            return 'Sad'
-        return 'Happy'
-
-    movies_processed['mood_category'] = movies_processed.apply(
-        lambda row: get_mood_category(row['sentiment_score'], row['tmdb_genres']), axis=1
-    )
+    # Per-movie feature stages run over chunks; pool.map keeps the output in input order
+    stage_cols = ['overview_text', 'sentiment_score', 'genres', 'keywords', 'cast', 'crew', 'tmdb_genres']
+    chunks = [
+        {col: movies_processed[col].iloc[start:start + PREPROCESS_CHUNK_SIZE].tolist() for col in stage_cols}
+        for start in range(0, len(movies_processed), PREPROCESS_CHUNK_SIZE)
+    ]
+    print(f"Parsing and tokenizing {len(movies_processed)} movies in {len(chunks)} chunks on {workers} worker(s)...")
+    results = run_chunks(preprocess_movie_chunk, chunks, workers)
+    for col in results[0] if results else []:
+        movies_processed[col] = [value for result in results for value in result[col]]
 
-    movies_processed['tags'] = movies_processed['overview_tokens'] + movies_processed['genres_tokens'] + movies_processed['keywords_tokens'] + movies_processed['cast_tokens'] + movies_processed['crew_tokens']
     df = movies_processed[['movie_id', 'title', 'tags', 'tmdb_poster_path', 'tmdb_year', 'tmdb_genres', 'tmdb_vote_average', 'tmdb_vote_count', 'mood_category', 'tmdb_original_language', 'tmdb_collection_id', 'overview_text']].copy()
     # Attach display names for API responses
     df['cast'] = movies_processed['cast_display']
     df['crew'] = movies_processed['directors_display']
-    df['tags'] = df['tags'].apply(lambda x: " ".join(x))
-    df['tags'] = df['tags'].apply(lambda x: x.lower())
-    ps = PorterStemmer()
-    print("Stemming text tokens...")
-    df['tags'] = df['tags'].apply(lambda text: " ".join([ps.stem(i) for i in text.split()]))
-    print("Building similarity matrix...")
-    # Use more features when processing all movies, fewer for limited dataset
-    max_features = 5000 if PROCESS_ALL_MOVIES else 3000
-    print(f"Using {max_features} features for vectorization")
-    cv = CountVectorizer(max_features=max_features, stop_words='english')
-    vectors = cv.fit_transform(df['tags']).toarray()
-    print("Calculating cosine similarity...")
-    similarity = cosine_similarity(vectors)
-    print(f"Similarity matrix shape: {similarity.shape}")
-    
-    # Cache the processed data and similarity matrix
-    print("Caching processed data and similarity matrix...")
-    try:
-        with open(processed_data_cache_path, 'wb') as f:
-            pickle.dump(df, f)
-        with open(similarity_cache_path, 'wb') as f:
-            pickle.dump(similarity, f)
-        # Write cache version file
-        with open(cache_version_file, 'w') as f:
-            f.write(CACHE_VERSION)
-        print(f"Cached data saved to {processed_data_cache_path} and {similarity_cache_path}")
-        print(f"Cache version {CACHE_VERSION} written")
-    except Exception as e:
-        print(f"Warning: Could not cache data: {e}")
-    
-    print("Data loading and model preprocessing complete.")
-    return df, similarity
+    # Flag inappropriate titles once; request paths filter with this column instead of re-scanning
+    df['is_blocked'] = df['title'].apply(contains_profanity)
+    df['tags'] = stem_tags(df['tags'])
+    return build_model(manifest)
 
-def recommend(movie_title):
-    global df, similarity
-    if df is None or similarity is None:
-        df, similarity = load_and_preprocess_data()
-
-    if df is None or similarity is None:
-        return [{
-            "title": "Recommendation system not ready.",
-            "poster_url": PLACEHOLDER_IMAGE_URL,
-            "year": "N/A",
-            "genres": [],
-            "vote_average": None,
-            "movie_id": None,
-            "language": "N/A"
-        }]
+# --- Response Cards ---
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+
+def encode_json(obj):
+    """Compact JSON bytes with the same settings jsonify uses (sorted keys, ASCII-escaped)."""
+    return JSON_ENCODER.encode(obj).encode()
+
+def movie_card(movie):
+    """Public card for one movie record, the fields every movie list endpoint returns."""
+    return {
+        'movie_id': int(movie['movie_id']), 'title': movie['title'],
+        'poster_url': f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL,
+        'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
+        'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
+        'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
+        'cast': (movie['cast'][:3] if isinstance(movie['cast'], list) else []),
+        'directors': (movie['crew'] if isinstance(movie['crew'], list) else []),
+    }
 
+def build_movie_cards(df):
+    """Build every movie's card once per loaded model.
+
+    Each card is also kept pre-encoded without its closing brace, and the overview as a
+    separate `,"overview":...` member, so responses are assembled by joining bytes.
+    """
+    global movie_cards
+    columns = ['movie_id', 'title', 'tmdb_poster_path', 'tmdb_year', 'tmdb_genres',
+               'tmdb_vote_average', 'tmdb_original_language', 'cast', 'crew']
+    records = [movie_card(movie) for movie in df[columns].to_dict('records')]
+    overviews = df['overview_text'].tolist()
+    movie_cards = {
+        'records': records,
+        'overviews': overviews,
+        'fragments': [encode_json(card)[:-1] for card in records],
+        'overview_fragments': [b',' + encode_json({'overview': text})[1:-1] for text in overviews],
+    }
+    print(f"Response cards built: {len(records)} movies")
+    return movie_cards
+
+def card_dicts(rows, overview=False, extras=None):
+    """Card dicts for `rows`, optionally with the overview and per-row extra fields."""
+    cards = []
+    for i, row in enumerate(rows):
+        card = dict(movie_cards['records'][row])
+        if overview:
+            card['overview'] = movie_cards['overviews'][row]
+        if extras is not None:
+            card.update(extras[i])
+        cards.append(card)
+    return cards
+
+def encoded_cards(rows, overview=False, extras=None):
+    """JSON bytes of each card of `rows`, completed from the pre-encoded fragments."""
+    fragments, overview_fragments = movie_cards['fragments'], movie_cards['overview_fragments']
+    parts = []
+    for i, row in enumerate(rows):
+        card = fragments[row]
+        if overview:
+            card += overview_fragments[row]
+        if extras is not None and extras[i]:
+            card += b',' + encode_json(extras[i])[1:-1]
+        parts.append(card + b'}')
+    return parts
+
+def encode_cards(rows, overview=False, extras=None):
+    """JSON array bytes for the cards of `rows`."""
+    return b'[' + b','.join(encoded_cards(rows, overview, extras)) + b']'
+
+def cards_response(key, rows, overview=False, extras=None, **fields):
+    """JSON response `{key: [cards], **fields}` built from the pre-encoded cards of `rows`."""
+    body = b'{"' + key.encode() + b'":' + encode_cards(rows, overview, extras)
+    if fields:
+        body += b',' + encode_json(fields)[1:-1]
+    return app.response_class(body + b'}\n', mimetype='application/json')
+
+# --- Pagination ---
+def page_bounds(params, default_limit=None):
+    """(offset, limit) for a list request; limit None means every remaining row.
+
+    The cursor is the next_cursor of the previous page, an offset into the ranked rows.
+    Raises ValueError on malformed values.
+    """
+    cursor, limit = params.get('cursor'), params.get('limit', default_limit)
+    try:
+        offset = int(cursor) if cursor not in (None, '') else 0
+        limit = int(limit) if limit not in (None, '', 'all') else None
+    except (TypeError, ValueError):
+        raise ValueError("'limit' must be a positive integer and 'cursor' a value returned as next_cursor")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise ValueError("'limit' must be a positive integer and 'cursor' a value returned as next_cursor")
+    return offset, limit
+
+def stream_cards(rows, overview=False, batch_size=NDJSON_BATCH_SIZE):
+    """Yield the cards of `rows` as NDJSON, one chunk per `batch_size` movies."""
+    for start in range(0, len(rows), batch_size):
+        yield b''.join(card + b'\n' for card in encoded_cards(rows[start:start + batch_size], overview))
+
+def paged_cards_response(key, rows, params, default_limit=None, overview=False, **fields):
+    """One page of the ranked `rows`, as `cards_response` JSON or streamed NDJSON.
+
+    Paged JSON responses (a limit or cursor was sent) add 'next_cursor' (None on the last
+    page) and 'total'; NDJSON carries them in the X-Next-Cursor and X-Total-Count headers.
+    """
+    try:
+        offset, limit = page_bounds(params, default_limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    page = rows[offset:] if limit is None else rows[offset:offset + limit]
+    end = offset + len(page)
+    next_cursor = str(end) if end < len(rows) else None
+    if str(params.get('format', 'json')).lower() == 'ndjson':
+        response = app.response_class(stream_cards(page, overview), mimetype='application/x-ndjson')
+        response.headers['X-Total-Count'] = str(len(rows))
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    if 'limit' in params or 'cursor' in params:
+        fields.update(next_cursor=next_cursor, total=len(rows))
+    return cards_response(key, page, overview, **fields)
+
+def status_card(message):
+    """Placeholder card recommend() returns when there is nothing to recommend."""
+    return {
+        "title": message,
+        "poster_url": PLACEHOLDER_IMAGE_URL,
+        "year": "N/A",
+        "genres": [],
+        "vote_average": None,
+        "movie_id": None,
+        "language": "N/A"
+    }
+
+def resolve_recommendation_title(movie_title):
+    """Row of the movie a recommendation request names: (row, None), or (None, status message)."""
     # Check for profanity in search query
     if contains_profanity(movie_title):
-        return [{
-            "title": "⚠️ Inappropriate search term detected",
-            "poster_url": PLACEHOLDER_IMAGE_URL,
-            "year": "N/A",
-            "genres": [],
-            "vote_average": None,
-            "movie_id": None,
-            "language": "N/A"
-        }]
-
-    # Rest of the function
+        return None, "⚠️ Inappropriate search term detected"
+
     movie_title = movie_title.strip()
     if not movie_title:
-        return [{
-            "title": "Please enter a movie title.",
-            "poster_url": PLACEHOLDER_IMAGE_URL,
-            "year": "N/A",
-            "genres": [],
-            "vote_average": None,
-            "movie_id": None,
-            "language": "N/A"
-        }]
+        return None, "Please enter a movie title."
 
-    try:
-        query = movie_title.strip().lower()
-
-        # Try exact match first
-        movie_matches = df[df['title'].str.lower().str.strip() == query]
-
-        # If no exact match, try fuzzy match
-        if movie_matches.empty:
-            close_matches = get_close_matches(query, df['title'].str.lower(), n=1, cutoff=0.6)
-            if close_matches:
-                movie_matches = df[df['title'].str.lower() == close_matches[0]]
-
-        if movie_matches.empty:
-            return [{
-                "title": f"Movie '{movie_title}' not found in database.",
-                "poster_url": PLACEHOLDER_IMAGE_URL,
-                "year": "N/A",
-                "genres": [],
-                "vote_average": None,
-                "movie_id": None,
-                "language": "N/A"
-            }]
-
-        # Determine positional index to align with the similarity matrix
-        base_movie_idx = df.index.get_loc(movie_matches.index[0])
-        base_movie = movie_matches.iloc[0]
-        recommended_movies = []
-
-        # Enhanced recommendation strategy with multiple layers
-        
-        # 1. Collection/Franchise-based recommendations (highest priority)
-        base_title_parts = base_movie['title'].lower().split(':')[0].split('-')[0].strip()
-        is_franchise = False
-        
-        if pd.notna(base_movie['tmdb_collection_id']):
-            collection_movies = df[
-                (df['tmdb_collection_id'] == base_movie['tmdb_collection_id']) &
-                (df['title'].str.lower() != base_movie['title'].lower())
-            ].sort_values('tmdb_year').head(3).to_dict('records')
-            is_franchise = True
-        else:
-            # Try title matching for franchises
-            collection_movies = df[
-                (df['title'].str.lower().str.contains(base_title_parts, regex=False)) &
-                (df['title'].str.lower() != base_movie['title'].lower()) &
-                (df['tmdb_genres'].apply(lambda x: any(g in base_movie['tmdb_genres'] for g in (x or []))))
-            ].sort_values('tmdb_year').head(3).to_dict('records')
-            is_franchise = len(collection_movies) > 0
-
-        for movie in collection_movies:
-            # Skip inappropriate content
-            if contains_profanity(movie['title']):
-                continue
-                
-            recommended_movies.append({
-                'movie_id': int(movie['movie_id']),
-                'title': movie['title'],
-                'poster_url': f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" 
-                               if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL,
-                'year': movie['tmdb_year'],
-                'genres': movie['tmdb_genres'],
-                'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-                'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-                'cast': (movie.get('cast')[:3] if isinstance(movie.get('cast'), list) else []),
-                'directors': (movie.get('crew') if isinstance(movie.get('crew'), list) else []),
-                'overview': movie.get('overview_text', ''),
-                'recommendation_reason': 'Same Franchise'
-            })
+    # Try exact match first, then fuzzy match
+    query = movie_title.lower()
+    base_movie_idx = find_movie_row(title=query)
+    if base_movie_idx is None:
+        base_movie_idx, _ = resolve_fuzzy_title(query)
 
-        # 2. Content-based similarity recommendations with quality filtering
-        if len(recommended_movies) < 20:
-            sim_scores = list(enumerate(similarity[base_movie_idx]))
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-            sim_scores = [x for x in sim_scores if x[0] != base_movie_idx]
-            
-            # Apply diversity and quality filters
-            for idx, sim_score in sim_scores:
-                if len(recommended_movies) >= 20:
-                    break
-                    
-                similar_movie = df.iloc[idx]
-                
-                # Skip if already recommended
-                if similar_movie['title'] in [m['title'] for m in recommended_movies]:
-                    continue
-                
-                # Skip inappropriate content
-                if contains_profanity(similar_movie['title']):
-                    continue
-                
-                # Quality filter: prioritize well-rated movies (vote_average >= 5.5)
-                if pd.notna(similar_movie['tmdb_vote_average']) and similar_movie['tmdb_vote_average'] < 5.5:
-                    continue
-                    
-                # Diversity filter: allow movies with similar themes even if genres differ slightly
-                base_genres = set(base_movie['tmdb_genres'] or [])
-                similar_genres = set(similar_movie['tmdb_genres'] or [])
-                genre_overlap = len(base_genres & similar_genres)
-                
-                # Accept if: 1) genres overlap, OR 2) high similarity score (>0.7) regardless of genre
-                if genre_overlap > 0 or sim_score > 0.7:
-                    reason = 'Similar Content'
-                    if sim_score > 0.8:
-                        reason = 'Highly Similar'
-                    elif genre_overlap >= len(base_genres) * 0.7:
-                        reason = 'Similar Genre & Style'
-                    
-                    recommended_movies.append({
-                        'movie_id': int(similar_movie['movie_id']),
-                        'title': similar_movie['title'],
-                        'poster_url': f"{TMDB_IMAGE_BASE_URL}{similar_movie['tmdb_poster_path']}" 
-                                       if pd.notna(similar_movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL,
-                        'year': similar_movie['tmdb_year'],
-                        'genres': similar_movie['tmdb_genres'],
-                        'vote_average': float(similar_movie['tmdb_vote_average']) if pd.notna(similar_movie['tmdb_vote_average']) else None,
-                        'language': similar_movie['tmdb_original_language'].upper() if pd.notna(similar_movie['tmdb_original_language']) else 'N/A',
-                        'cast': (similar_movie['cast'][:3] if isinstance(similar_movie['cast'], list) else []),
-                        'directors': (similar_movie['crew'] if isinstance(similar_movie['crew'], list) else []),
-                        'overview': similar_movie.get('overview_text', ''),
-                        'similarity_score': float(sim_score),
-                        'recommendation_reason': reason
-                    })
-
-        # 3. Rank by multiple factors for final output
-        def recommendation_score(movie):
-            score = 0
-            # Franchise movies get highest priority
-            if movie.get('recommendation_reason') == 'Same Franchise':
-                score += 100
-            # High similarity score
-            score += movie.get('similarity_score', 0) * 50
-            # High rating boost
-            if movie.get('vote_average'):
-                score += movie['vote_average'] * 5
-            # Recency boost (newer movies slight advantage)
-            if movie.get('year') and movie['year'].isdigit():
-                year_score = (int(movie['year']) - 1900) / 100
-                score += year_score
-            return score
-        
-        # Sort by composite score
-        recommended_movies.sort(key=recommendation_score, reverse=True)
-        
-        return recommended_movies[:20]  # Return top 20
+    if base_movie_idx is None:
+        return None, f"Movie '{movie_title}' not found in database."
+    return base_movie_idx, None
+
+def recommend_rows(movie_title):
+    """Resolve `movie_title` and rank its recommendations.
+
+    Returns (rows, extras) as rank_recommendations() does for one movie. When there is nothing to rank,
+    rows is None and extras is the message for the status card.
+    """
+    global df
+    if df is None or model_arrays is None:
+        df, _ = load_and_preprocess_data()
+
+    if df is None or model_arrays is None:
+        return None, "Recommendation system not ready."
+
+    try:
+        base_movie_idx, message = resolve_recommendation_title(movie_title)
+        if base_movie_idx is None:
+            return None, message
+        return rank_recommendations([base_movie_idx])[0]
 
     except Exception as e:
         print(f"Error in recommendation for '{movie_title}': {str(e)}")
-        return [{
-            "title": f"Error processing recommendation: {str(e)}",
-            "poster_url": PLACEHOLDER_IMAGE_URL,
-            "year": "N/A",
-            "genres": [],
-            "vote_average": None,
-            "movie_id": None,
-            "language": "N/A"
-        }]
+        return None, f"Error processing recommendation: {str(e)}"
+
+def rank_recommendations(base_rows):
+    """Ranked recommendations for each movie in `base_rows`, computed as one batch.
+
+    Returns one (rows, extras) per base row: at most 20 row positions, best first, with each
+    row's recommendation_reason (and similarity_score for similar movies).
+    """
+    # Enhanced recommendation strategy with multiple layers
+    # Positional indexes align with the neighbor index, model arrays and response cards
+
+    # 1. Collection/Franchise-based recommendations (highest priority), one franchise index lookup
+    franchise_picks = []
+    for base_movie_idx in base_rows:
+        recommended_rows = franchise_rows(base_movie_idx)
+        # Skip inappropriate content
+        franchise_picks.append(recommended_rows[~model_arrays['is_blocked'][recommended_rows]])
+
+    # 2. Content-based similarity recommendations with quality filtering
+    # Candidates come pre-sorted from the recommendation engine (self already excluded);
+    # quality, profanity, genre-overlap and dedupe filters run as array operations
+    similar = select_similar_rows(
+        base_rows,
+        [indexes['title_codes'][recommended_rows] for recommended_rows in franchise_picks],
+        [max(0, 20 - len(recommended_rows)) for recommended_rows in franchise_picks],
+    )
+
+    ranked = []
+    for recommended_rows, (similar_rows, similar_scores, reasons) in zip(franchise_picks, similar):
+        extras = [{'recommendation_reason': 'Same Franchise'} for _ in recommended_rows]
+        extras += [
+            {'similarity_score': float(sim_score), 'recommendation_reason': str(reason)}
+            for sim_score, reason in zip(similar_scores, reasons)
+        ]
+
+        # 3. Rank by multiple factors for final output:
+        # franchise +100, similarity * 50, rating * 5, recency (year - 1900) / 100
+        rows = np.concatenate([recommended_rows, similar_rows]).astype(np.int64)
+        vote_average = model_arrays['vote_average'][rows]
+        years = indexes['years'][rows]
+        score = np.where(np.arange(len(rows)) < len(recommended_rows), 100.0, 0.0)
+        score = score + np.concatenate([np.zeros(len(recommended_rows)), np.asarray(similar_scores, dtype=np.float64)]) * 50
+        score = score + np.where(np.nan_to_num(vote_average) != 0, np.nan_to_num(vote_average) * 5, 0.0)
+        score = score + np.where(np.isnan(years), 0.0, (np.nan_to_num(years) - 1900) / 100)
+        # Stable, so equal scores keep their stage order
+        order = np.argsort(-score, kind='stable')[:20]  # Return top 20
+        ranked.append((rows[order], [extras[i] for i in order]))
+    return ranked
+
+def recommend(movie_title):
+    rows, extras = recommend_rows(movie_title)
+    if rows is None:
+        return [status_card(extras)]
+    return card_dicts(rows, overview=True, extras=extras)
 
 @app.route('/top_watched')
 def get_top_watched_movies():
     global df
     if df is None: df, _ = load_and_preprocess_data()
-    top_movies = df[df['tmdb_vote_count'].notna() & (df['tmdb_vote_count'] >= 100)].sort_values(by=['tmdb_vote_average', 'tmdb_vote_count'], ascending=[False, False]).to_dict('records')
-    formatted_top_movies = []
-    for movie in top_movies:
-        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL
-        formatted_top_movies.append({
-            'movie_id': int(movie['movie_id']), 'title': movie['title'], 'poster_url': poster_url,
-            'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
-            'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-            'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-            'cast': (movie['cast'][:3] if isinstance(movie.get('cast'), list) else []),
-            'directors': (movie['crew'] if isinstance(movie.get('crew'), list) else []),
-            'overview': movie.get('overview_text', '')
-        })
-    return jsonify({"movies": formatted_top_movies[:10]})
+    # Movies with 100+ votes, best rated first; the first 10 unless a limit is given
+    return paged_cards_response('movies', result_tables['top'], request.args, default_limit=10, overview=True)
 
 @app.route('/moodwise_text_input', methods=['POST'])
 def recommend_by_text_mood():
@@ -785,129 +1971,15 @@ def recommend_by_text_mood():
             "mood_detected": "Invalid"
         }), 400
     
-    user_sentiment = analyzer.polarity_scores(user_text)['compound']
-    
-    def classify_user_mood(sentiment_score, user_text_lower):
-        # Normalize input for simpler matching
-        text = user_text_lower
-
-        # Emotional/Dramatic routes
-        if any(kw in text for kw in ['had a tough day', 'tough day', 'stress', 'stressed', 'exhausted', 'tired', 'drained', 'burnt out', 'burned out', 'overwhelmed', 'sad', 'heartbroken', 'heart broken', 'breakup', 'broke up', 'lonely', 'alone', 'depressed']):
-            return 'Drama'
-
-        # Strong signals first
-        if any(kw in text for kw in ['horror', 'scary', 'spooky', 'creepy', 'gore', 'gory', 'slasher', 'ghost', 'zombie', 'paranormal', 'possession']):
-            return 'Horror'
-        
-        # Mysterious button - maps to Intense/Mystery
-        if text.strip() == 'mysterious' or 'mysterious' in text:
-            return 'Intense/Mystery'
-        
-        # Thrilling button - maps to Action/Adventure  
-        if text.strip() == 'thrilling' or (text.strip() == 'thriller' or 'thrilling' in text):
-            return 'Action/Adventure'
-            
-        if any(kw in text for kw in [
-            'mystery', 'crime', 'detective', 'puzzle', 'thriller', 'suspense', 'noir', 'whodunit',
-            'psychological', 'twist', 'investigation', 'serial killer', 'heist', 'conspiracy']):
-            return 'Intense/Mystery'
-
-        # Romantic button - maps to broader romance
-        if text.strip() == 'romantic':
-            return 'Romantic/Dramatic'
-            
-        # Other categories
-        if any(kw in text for kw in ['romcom', 'rom-com', 'romantic comedy', 'meet-cute', 'date night', 'banter', 'cute rom', 'feel-good romance', 'light romance']):
-            return 'Romcom'
-        if any(kw in text for kw in ['romance', 'love', 'relationship', 'heartfelt', 'romantic drama']):
-            return 'Romantic/Dramatic'
-        if any(kw in text for kw in ['action', 'adventure', 'fight', 'battle', 'chase', 'spy', 'espionage', 'war', 'martial arts', 'car chase', 'explosive']):
-            return 'Action/Adventure'
-        if any(kw in text for kw in ['happy', 'joyful', 'fun', 'uplifting', 'comedy', 'lighthearted', 'feel-good', 'wholesome', 'family-friendly', 'light']):
-            return 'Happy'
-        
-        # Inspiring button - maps to Thought-Provoking
-        if text.strip() == 'inspiring':
-            return 'Thought-Provoking'
-            
-        # Inspiring content - maps to uplifting/motivational movies (sports, biographies, dramas with positive message)
-        if any(kw in text for kw in ['inspirational', 'motivational', 'motivating', 'empowering', 'triumph', 'overcome', 'achievement', 'success story', 'hero', 'heroic', 'courage', 'brave', 'hopeful', 'hope']):
-            return 'Thought-Provoking'
-        if any(kw in text for kw in ['documentary', 'learn', 'explore', 'history', 'biography', 'biopic', 'informative', 'educational', 'philosophical', 'mind-bending', 'political', 'social issues', 'true story']):
-            return 'Thought-Provoking'
-        if any(kw in text for kw in ['chill', 'relax', 'calm', 'peaceful', 'cozy', 'comfort', 'soothing', 'slow', 'slice of life']):
-            return 'Relaxing'
-        if any(kw in text for kw in ['fantasy', 'sci-fi', 'science fiction', 'fiction', 'space', 'aliens', 'superhero', 'magical', 'mythical', 'space opera', 'time travel']):
-            return 'Escapist'
-        if any(kw in text for kw in ['sad', 'melodrama', 'tragic', 'weepie', 'emotional', 'poignant', 'heartbreaking']):
-            return 'Drama'
-
-        # Sentiment-based fallback (no Neutral)
-        if sentiment_score >= 0.7:
-            return 'Happy'
-        elif sentiment_score >= 0.3:
-            return 'Relaxing'
-        elif sentiment_score <= -0.5:
-            return 'Drama'
-        elif sentiment_score <= -0.2:
-            return 'Intense/Mystery'
-        else:
-            return 'Happy'
-    
-    desired_mood = classify_user_mood(user_sentiment, user_text.lower())
+    desired_mood = classify_user_mood(user_text)
     
-    # Apply explicit genre-based filtering for all moods
-    if desired_mood == 'Horror':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'horror' for g in gs))]
-    elif desired_mood == 'Intense/Mystery':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['mystery', 'crime', 'thriller'] for g in gs))]
-    elif desired_mood == 'Romcom':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and 
-                                                   'comedy' in [g.lower() for g in gs if isinstance(g, str)] and 
-                                                   'romance' in [g.lower() for g in gs if isinstance(g, str)])]
-    elif desired_mood == 'Happy':
-        # Happy includes comedy, family, animation (uplifting genres)
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['comedy', 'family', 'animation'] for g in gs))]
-    elif desired_mood == 'Action/Adventure':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['action', 'adventure'] for g in gs))]
-    elif desired_mood == 'Drama':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'drama' for g in gs))]
-    elif desired_mood == 'Thought-Provoking':
-        # Documentary, history, biography movies - inspirational/educational content
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['documentary', 'history'] for g in gs))]
-        # If too few, also include highly-rated dramas (8.0+)
-        if len(mood_movies) < 10:
-            drama_movies = df[(df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'drama' for g in gs))) & 
-                             (df['tmdb_vote_average'] >= 8.0)]
-            mood_movies = pd.concat([mood_movies, drama_movies]).drop_duplicates()
-    elif desired_mood == 'Romantic/Dramatic':
-        # Romance movies only (not just drama)
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'romance' for g in gs))]
-    elif desired_mood == 'Relaxing':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['comedy', 'family', 'animation'] for g in gs))]
-    elif desired_mood == 'Escapist':
-        # Fantasy, sci-fi, adventure for escapism
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['fantasy', 'science fiction', 'adventure'] for g in gs))]
-    else:
+    # Ranked results per mood are precomputed with the model (genre rules, vote and profanity filters)
+    mood_rows = result_tables.get(f'mood:{desired_mood}')
+    if mood_rows is None:
         # Fallback to mood_category
-        mood_movies = df[df['mood_category'] == desired_mood]
-
-    mood_movies = mood_movies[mood_movies['tmdb_vote_count'].notna() & (mood_movies['tmdb_vote_count'] >= 10)]
-    # Filter out inappropriate content
-    mood_movies = mood_movies[~mood_movies['title'].apply(contains_profanity)]
-    formatted_movies = []
-    mood_movies_list_of_dicts = mood_movies.sort_values(by=['tmdb_vote_average', 'tmdb_vote_count'], ascending=[False, False]).head(10).to_dict('records')
-    for movie in mood_movies_list_of_dicts:
-        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL
-        formatted_movies.append({
-            'movie_id': int(movie['movie_id']), 'title': movie['title'], 'poster_url': poster_url,
-            'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
-            'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-            'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-            'cast': (movie['cast'][:3] if isinstance(movie.get('cast'), list) else []),
-            'directors': (movie['crew'] if isinstance(movie.get('crew'), list) else [])
-        })
-    return jsonify({"movies": formatted_movies, "mood_detected": desired_mood})
+        mood_rows = rank_movie_rows(df, (df['mood_category'] == desired_mood).to_numpy(),
+                                    blocked=df['is_blocked'].to_numpy(dtype=bool))
+    return cards_response('movies', mood_rows[:10], mood_detected=desired_mood)
 
 @app.route('/get_movies_by_mood_category', methods=['POST'])
 def get_movies_by_mood_category_route():
@@ -919,64 +1991,15 @@ def get_movies_by_mood_category_route():
     
     # Normalize category naming
     requested = str(category).strip()
-    category_norm = 'Intense/Mystery' if requested in ['Intense', 'Intense/Mystery', 'Intense Mystery', 'Mystery/Intense'] else requested
-
-    # Apply explicit genre-based filtering for all mood categories
-    if category_norm == 'Horror':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'horror' for g in gs))]
-    elif category_norm == 'Intense/Mystery':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['mystery', 'crime', 'thriller'] for g in gs))]
-    elif category_norm == 'Romcom':
-        # For romcom, require BOTH comedy AND romance
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and 
-                                                   'comedy' in [g.lower() for g in gs if isinstance(g, str)] and 
-                                                   'romance' in [g.lower() for g in gs if isinstance(g, str)])]
-    elif category_norm == 'Happy':
-        # Happy includes comedy, family, animation (uplifting genres)
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['comedy', 'family', 'animation'] for g in gs))]
-    elif category_norm == 'Action/Adventure':
-        # Action/Adventure includes action or adventure genres
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() in ['action', 'adventure'] for g in gs))]
-    elif category_norm == 'Drama':
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(g, str) and g.lower() == 'drama' for g in gs))]
-    elif category_norm in ['Western', 'Fantasy', 'Superhero', 'Science Fiction', 'Sci-Fi', 'Scifiction']:
-        def genre_match(gs, targets):
-            if not isinstance(gs, list):
-                return False
-            lower = [g.lower() for g in gs if isinstance(g, str)]
-            if 'western' in targets:
-                return 'western' in lower
-            if 'fantasy' in targets:
-                return 'fantasy' in lower
-            if 'science fiction' in targets:
-                return 'science fiction' in lower or 'sci-fi' in lower
-            if 'superhero' in targets:
-                return (('science fiction' in lower or 'fantasy' in lower) and ('action' in lower or 'adventure' in lower))
-            return False
-        key = category_norm.lower()
-        canonical = 'science fiction' if key in ['science fiction', 'sci-fi', 'scifiction'] else key
-        mood_movies = df[df['tmdb_genres'].apply(lambda gs: genre_match(gs, [canonical]))]
+    category_norm = CATEGORY_ALIASES.get(requested, requested)
+    rule_key = CATEGORY_RULE_ALIASES.get(category_norm, category_norm)
+
+    # Genre-rule categories and mood_category fallbacks are both precomputed with the model
+    if rule_key in CATEGORY_GENRE_RULES:
+        mood_rows = result_tables[f'category:{rule_key}']
     else:
-        # Fallback to mood_category for any other categories
-        mood_movies = df[df['mood_category'] == category_norm]
-    
-    # Filter by vote count (at least 10 votes for quality)
-    mood_movies = mood_movies[mood_movies['tmdb_vote_count'].notna() & (mood_movies['tmdb_vote_count'] >= 10)]
-    # Filter out inappropriate content
-    mood_movies = mood_movies[~mood_movies['title'].apply(contains_profanity)]
-    formatted_movies = []
-    mood_movies_list_of_dicts = mood_movies.sort_values(by=['tmdb_vote_average', 'tmdb_vote_count'], ascending=[False, False]).head(10).to_dict('records')
-    for movie in mood_movies_list_of_dicts:
-        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL
-        formatted_movies.append({
-            'movie_id': int(movie['movie_id']), 'title': movie['title'], 'poster_url': poster_url,
-            'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
-            'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-            'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-            'cast': (movie['cast'][:3] if isinstance(movie.get('cast'), list) else []),
-            'directors': (movie['crew'] if isinstance(movie.get('crew'), list) else [])
-        })
-    return jsonify({"movies": formatted_movies, "mood_detected": category_norm})
+        mood_rows = result_tables.get(f'category:{category_norm}', np.empty(0, dtype=np.int32))
+    return cards_response('movies', mood_rows[:10], mood_detected=category_norm)
 
 @app.route('/add_to_collection', methods=['POST'])
 def add_to_collection():
@@ -1042,12 +2065,68 @@ def get_recommendations():
         if not title:
             return jsonify({"error": "Movie title is required"}), 400
         
-        recommendations = recommend(title)
-        return jsonify({"recommendations": recommendations}), 200
+        rows, extras = recommend_rows(title)
+        if rows is None:
+            return jsonify({"recommendations": [status_card(extras)]}), 200
+        return cards_response('recommendations', rows, overview=True, extras=extras), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/recommend_batch', methods=['POST'])
+def recommend_batch():
+    """Recommendations for many titles and/or movie_ids in one call.
+
+    Every query is resolved first, then all found movies are ranked together: one batched
+    similarity lookup (get_similar_movies_batch) and one pass of the stage-2 filters.
+    Results keep the request order, titles first, each with 'recommendations' or an 'error'.
+    """
+    global df
+    if df is None: df, _ = load_and_preprocess_data()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    titles = data.get('titles') or []
+    movie_ids = data.get('movie_ids') or []
+    if not isinstance(titles, list) or not isinstance(movie_ids, list):
+        return jsonify({"error": "'titles' and 'movie_ids' must be lists"}), 400
+    if not titles and not movie_ids:
+        return jsonify({"error": "'titles' or 'movie_ids' is required"}), 400
+    if len(titles) + len(movie_ids) > RECOMMEND_BATCH_MAX_SIZE:
+        return jsonify({"error": f"At most {RECOMMEND_BATCH_MAX_SIZE} titles and movie_ids per request"}), 400
+
+    # Resolve every query; slots hold (query, base row or None, error message)
+    slots = []
+    for title in titles:
+        # Like /recommend, a title must be a non-empty string; anything else gets an error slot
+        if not isinstance(title, str) or not title.strip():
+            slots.append(({'title': title}, None, "Movie title is required"))
+            continue
+        row, message = resolve_recommendation_title(title)
+        slots.append(({'title': title}, row, message))
+    for movie_id in movie_ids:
+        row = find_movie_row(movie_id=movie_id)
+        slots.append(({'movie_id': movie_id}, row, None if row is not None else f"Movie id '{movie_id}' not found in database."))
+
+    # Each distinct movie is ranked once, all of them in the same batch
+    base_rows = np.unique([row for _, row, _ in slots if row is not None]).astype(np.int64)
+    try:
+        ranked = dict(zip(base_rows.tolist(), rank_recommendations(base_rows) if len(base_rows) else []))
+    except Exception as e:
+        print(f"Error in batch recommendation: {str(e)}")
+        return jsonify({"error": f"Error processing recommendation: {str(e)}"}), 500
+
+    results = []
+    for query, row, message in slots:
+        head = encode_json(query)[:-1]
+        if row is None:
+            results.append(head + b',' + encode_json({'error': message})[1:-1] + b'}')
+            continue
+        rows, extras = ranked[int(row)]
+        results.append(head + b',"recommendations":' + encode_cards(rows, overview=True, extras=extras) + b'}')
+    body = b'{"results":[' + b','.join(results) + b']}\n'
+    return app.response_class(body, mimetype='application/json'), 200
+
 
 @app.route('/get_movies_by_genre', methods=['POST'])
 def get_movies_by_genre():
@@ -1057,21 +2136,8 @@ def get_movies_by_genre():
     genre = data.get('genre')
     if not genre: return jsonify({"error": "Genre is required"}), 400
     g = str(genre).strip().lower()
-    genre_movies = df[df['tmdb_genres'].apply(lambda gs: isinstance(gs, list) and any(isinstance(x, str) and x.lower() == g for x in gs))]
-    genre_movies = genre_movies[genre_movies['tmdb_vote_count'].notna() & (genre_movies['tmdb_vote_count'] >= 10)]
-    formatted_movies = []
-    genre_movies_list_of_dicts = genre_movies.sort_values(by=['tmdb_vote_average', 'tmdb_vote_count'], ascending=[False, False]).to_dict('records')
-    for movie in genre_movies_list_of_dicts:
-        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL
-        formatted_movies.append({
-            'movie_id': int(movie['movie_id']), 'title': movie['title'], 'poster_url': poster_url,
-            'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
-            'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-            'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-            'cast': (movie['cast'][:3] if isinstance(movie.get('cast'), list) else []),
-            'directors': (movie['crew'] if isinstance(movie.get('crew'), list) else [])
-        })
-    return jsonify({"movies": formatted_movies, "genre": genre})
+    genre_rows = result_tables.get(f'genre:{g}', np.empty(0, dtype=np.int32))
+    return paged_cards_response('movies', genre_rows, data, genre=genre)
 
 @app.route('/get_movies_by_person', methods=['POST'])
 def get_movies_by_person():
@@ -1085,27 +2151,23 @@ def get_movies_by_person():
     n = str(name).strip().lower()
     role = role.strip().lower()
 
-    if role == 'cast':
-        person_movies = df[df['cast'].apply(lambda lst: isinstance(lst, list) and any(isinstance(x, str) and x.lower() == n for x in lst))]
-    elif role == 'director':
-        person_movies = df[df['crew'].apply(lambda lst: isinstance(lst, list) and any(isinstance(x, str) and x.lower() == n for x in lst))]
-    else:
+    person_index = indexes['people'].get(role)
+    if person_index is None:
         return jsonify({"error": "Invalid role. Use 'cast' or 'director'"}), 400
+    # Postings only hold movies with 10+ votes, already best rated first
+    person_rows = person_index['postings'].get(n, np.empty(0, dtype=np.int32))
+    return paged_cards_response('movies', person_rows, data, person=name, role=role)
 
-    person_movies = person_movies[person_movies['tmdb_vote_count'].notna() & (person_movies['tmdb_vote_count'] >= 10)]
-    formatted = []
-    movies_list = person_movies.sort_values(by=['tmdb_vote_average', 'tmdb_vote_count'], ascending=[False, False]).to_dict('records')
-    for movie in movies_list:
-        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['tmdb_poster_path']}" if pd.notna(movie['tmdb_poster_path']) else PLACEHOLDER_IMAGE_URL
-        formatted.append({
-            'movie_id': int(movie['movie_id']), 'title': movie['title'], 'poster_url': poster_url,
-            'year': movie['tmdb_year'], 'genres': movie['tmdb_genres'],
-            'vote_average': float(movie['tmdb_vote_average']) if pd.notna(movie['tmdb_vote_average']) else None,
-            'language': movie['tmdb_original_language'].upper() if pd.notna(movie['tmdb_original_language']) else 'N/A',
-            'cast': (movie.get('cast')[:3] if isinstance(movie.get('cast'), list) else []),
-            'directors': (movie.get('crew') if isinstance(movie.get('crew'), list) else [])
-        })
-    return jsonify({"movies": formatted, "person": name, "role": role})
+@app.route('/person_suggestions', methods=['GET'])
+def person_suggestions_route():
+    global df
+    if df is None: df, _ = load_and_preprocess_data()
+    query = request.args.get('q', '').strip().lower()
+    role = request.args.get('role', 'cast').strip().lower()
+    if role not in indexes['people']:
+        return jsonify({"error": "Invalid role. Use 'cast' or 'director'"}), 400
+    if not query: return jsonify([])
+    return jsonify(person_prefix_matches(indexes['people'][role], query))
 
 @app.route('/search_suggestions', methods=['GET'])
 def search_suggestions_route():
@@ -1113,9 +2175,7 @@ def search_suggestions_route():
     if df is None: df, _ = load_and_preprocess_data()
     query = request.args.get('q', '').lower()
     if not query: return jsonify([])
-    matching_titles = df[df['title'].str.lower().str.contains(query)]['title'].unique().tolist()
-    suggestions = sorted(matching_titles)[:10]
-    return jsonify(suggestions)
+    return jsonify(suggest_titles(query))
 
 @app.route('/sample_posters')
 def sample_posters():
@@ -1144,17 +2204,9 @@ def movie_overview():
     data = request.get_json()
     movie_id = data.get('movie_id')
     title = data.get('title')
-    row = None
-    if movie_id is not None:
-        try:
-            row = df[df['movie_id'] == int(movie_id)]
-        except Exception:
-            row = df[df['movie_id'].astype(str) == str(movie_id)]
-    elif title:
-        t = str(title).strip().lower()
-        row = df[df['title'].str.lower().str.strip() == t]
-    if row is not None and not row.empty:
-        overview = row.iloc[0].get('overview_text', '')
+    row = find_movie_row(movie_id=movie_id, title=title)
+    if row is not None:
+        overview = df.iloc[row].get('overview_text', '')
         return jsonify({'overview': overview or ''}), 200
     return jsonify({'overview': ''}), 200
 
@@ -1175,22 +2227,18 @@ def movie_details():
             tmdb_id = None
 
     if tmdb_id is None and title:
-        t = str(title).strip().lower()
-        row = df[df['title'].str.lower().str.strip() == t]
-        if not row.empty:
+        row = find_movie_row(title=title)
+        if row is not None:
             try:
-                tmdb_id = int(row.iloc[0]['movie_id'])
+                tmdb_id = int(df.iloc[row]['movie_id'])
             except Exception:
                 pass
 
     if tmdb_id is None:
         return jsonify({'error': 'movie_id or title is required'}), 400
 
-    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US&append_to_response=credits,reviews"
     try:
-        resp = requests_session.get(url, timeout=12)
-        resp.raise_for_status()
-        data = resp.json()
+        data = get_tmdb_movie_details(tmdb_id)
 
         poster_path = data.get('poster_path')
         backdrop_path = data.get('backdrop_path')
@@ -1237,12 +2285,9 @@ def movie_details():
         backdrop_url = f"{TMDB_IMAGE_BASE_URL}{backdrop_path}" if backdrop_path else None
 
         if not overview:
-            try:
-                row = df[df['movie_id'] == int(tmdb_id)]
-                if not row.empty:
-                    overview = row.iloc[0].get('overview_text', '') or ''
-            except Exception:
-                pass
+            row = find_movie_row(movie_id=tmdb_id)
+            if row is not None:
+                overview = df.iloc[row].get('overview_text', '') or ''
 
         return jsonify({
             'movie_id': tmdb_id,
@@ -1264,6 +2309,14 @@ def movie_details():
     except requests.exceptions.RequestException as e:
         return jsonify({'error': f'Failed to fetch details: {str(e)}'}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Per-process counters for the outbound TMDB coalescing layer."""
+    return jsonify({
+        'pid': os.getpid(),
+        'single_flight': {f.name: f.snapshot() for f in (tmdb_details_flight,)}
+    })
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -1273,7 +2326,7 @@ if 'gunicorn' in os.environ.get('SERVER_SOFTWARE', '').lower() or os.environ.get
     print("PRELOADING DATA FOR GUNICORN...")
     print("="*60)
     try:
-        df, similarity = load_and_preprocess_data()
+        df, _ = load_and_preprocess_data()
         print(" Successfully preloaded {0} movies".format(len(df)))
         print("="*60)
     except Exception as e:
@@ -35,7 +35,8 @@ tmp_upload_dir = None
 max_requests = 1000  # Restart workers after 1000 requests to prevent memory leaks
 max_requests_jitter = 50
 
-# Preload app for faster startup
+# Preload app for faster startup. Model arrays are opened with np.load(mmap_mode='r'),
+# so forked workers share one page-cache copy instead of holding their own.
 preload_app = True
 
 def on_starting(server):
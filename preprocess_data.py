@@ -4,6 +4,7 @@ Standalone script to preprocess all movie data and generate cache files.
 Run this locally with Docker before deploying to Render.
 """
 
+import argparse
 import os
 import sys
 
@@ -14,6 +15,11 @@ os.environ['PROCESS_ALL_MOVIES'] = 'true'
 from app import load_and_preprocess_data
 
 def main():
+    parser = argparse.ArgumentParser(description="Preprocess all movies and build the model artifacts.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the per-movie preprocessing stages (default: all cores)")
+    args = parser.parse_args()
+
     print("="*80)
     print("CINEMATCH DATA PREPROCESSING")
     print("="*80)
@@ -21,17 +27,15 @@ def main():
     print("The cache files can then be deployed to Render.\n")
     
     try:
-        df, similarity = load_and_preprocess_data()
+        df, model_arrays = load_and_preprocess_data(workers=args.workers)
         
         print("\n" + "="*80)
         print(f"✅ SUCCESS! Processed {len(df)} movies")
         print("="*80)
         print("\nGenerated files:")
-        print("  - data/processed_data_cache.pkl")
-        print("  - data/similarity_cache.pkl")
-        print("  - data/cache_version.txt")
+        print("  - data/model/ (manifest.json + movies.parquet + .npy arrays)")
         print("\nNext steps:")
-        print("  1. Commit the cache files: git add data/*.pkl data/cache_version.txt")
+        print("  1. Commit the artifacts: git add data/model")
         print("  2. Push to GitHub: git push origin main")
         print("  3. Render will auto-deploy with pre-processed data!")
         print("="*80 + "\n")
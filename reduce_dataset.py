@@ -53,7 +53,5 @@ print(f"\nExpected cache file size: ~73MB (down from 176MB)")
 
 print("\n✓ Dataset reduction complete!")
 print("\nNext steps:")
-print("1. Delete the old cache files:")
-print("   - data/processed_data_cache.pkl")
-print("   - data/similarity_cache.pkl")
-print("2. Test the backend locally to regenerate smaller cache files")
+print("1. Start the backend: data/model is rebuilt automatically because the input CSVs changed")
+print("2. Test the backend locally with the smaller artifacts")
@@ -15,27 +15,26 @@ print("\n1. Starting data load and preprocessing...")
 start_time = time.time()
 
 try:
-    df, similarity = load_and_preprocess_data()
+    df, model_arrays = load_and_preprocess_data()
     load_time = time.time() - start_time
     
     print(f"\n✓ Data loaded successfully in {load_time:.2f} seconds!")
     print(f"\nDataset statistics:")
     print(f"  - Number of movies: {len(df)}")
-    print(f"  - Similarity matrix shape: {similarity.shape}")
-    print(f"  - Memory size: ~{similarity.nbytes / (1024*1024):.1f} MB")
+    if 'neighbor_indices' in model_arrays:
+        print(f"  - Neighbor index shape: {model_arrays['neighbor_indices'].shape}")
+    print(f"  - Feature non-zeros: {len(model_arrays['feature_data'])}")
+    model_bytes = sum(arr.nbytes for arr in model_arrays.values())
+    print(f"  - Model arrays size: ~{model_bytes / (1024*1024):.1f} MB")
     
-    # Check if cache files were created
-    if os.path.exists('data/processed_data_cache.pkl'):
-        size_mb = os.path.getsize('data/processed_data_cache.pkl') / (1024*1024)
-        print(f"\n✓ processed_data_cache.pkl created: {size_mb:.2f} MB")
-    
-    if os.path.exists('data/similarity_cache.pkl'):
-        size_mb = os.path.getsize('data/similarity_cache.pkl') / (1024*1024)
-        print(f"✓ similarity_cache.pkl created: {size_mb:.2f} MB")
+    # Check if the artifacts were created
+    if os.path.exists('data/model/manifest.json'):
+        size_mb = sum(os.path.getsize(os.path.join('data/model', f)) for f in os.listdir('data/model')) / (1024*1024)
+        print(f"✓ data/model artifacts created: {size_mb:.2f} MB")
     
     print(f"\n✓ Data processing successful!")
     print(f"\nThe backend should now work with:")
-    print(f"  - 82.7% smaller similarity matrix")
+    print(f"  - Top-K neighbor index instead of a dense similarity matrix")
     print(f"  - {load_time:.1f}s processing time (acceptable for deployment)")
     print(f"  - Cache files under 100MB (GitHub compatible)")
     